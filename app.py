@@ -1,18 +1,28 @@
-from flask import Flask, request, render_template, jsonify, send_from_directory
+from flask import Flask, request, render_template, jsonify, send_from_directory, Response
+import json
 import os
 import pandas as pd
 import shutil
 import traceback
-from src.feature_extraction import count_pauses, extract_text_features, semantic_coherence
-from src.preprocessing import transcribe_audio, convert_to_wav
+import zipfile
+from src.feature_extraction import count_pauses, extract_text_features, speech_rate
+from src.pitch import pitch_variability
+from src.audio import SUPPORTED_EXTENSIONS, load_audio, check_duration
+from src.transcript import parse_transcript
+from src.inference_service import transcribe_audio, semantic_coherence
 from src.modeling import run_modeling
-import librosa
-import numpy as np
+from src.model_registry import preload_from_env
+from src.instrumentation import collect_timings, render_metrics
+from src.jobs import job_manager, extract_archive, to_native
 import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 app = Flask(__name__)
 
+# Models load lazily on first use; VCD_PRELOAD_MODELS warms them up at import instead
+preload_from_env()
+
 # Use temporary directories for serverless environment
 def get_temp_dirs():
     temp_base = tempfile.gettempdir()
@@ -25,6 +35,35 @@ def get_temp_dirs():
     
     return raw_dir, transcript_dir, processed_dir
 
+# Uploads are analysed from memory. Set VCD_ARCHIVE_UPLOADS=1 to also keep a copy
+# of each upload and its transcript, written by a background thread.
+ARCHIVE_UPLOADS = os.environ.get("VCD_ARCHIVE_UPLOADS", "0") != "0"
+archive_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="archive")
+
+def archive_upload(filename, data, transcript=None):
+    raw_dir, transcript_dir, _ = get_temp_dirs()
+    filename = os.path.basename(filename)
+    with open(os.path.join(raw_dir, filename), "wb") as f:
+        f.write(data)
+    if transcript is not None:
+        with open(os.path.join(transcript_dir, os.path.splitext(filename)[0] + ".txt"), "w", encoding="utf-8") as f:
+            f.write(transcript)
+
+def parse_bool(value):
+    """Query-string boolean, accepting the same spellings as FastAPI; None if invalid."""
+    value = value.strip().lower()
+    if value in ("1", "true", "yes", "on"):
+        return True
+    if value in ("0", "false", "no", "off"):
+        return False
+    return None
+
+def log_archive_failure(future):
+    # Archival is never waited on, so report its errors here instead of losing them
+    if not future.cancelled() and future.exception() is not None:
+        print("Failed to archive upload:")
+        traceback.print_exception(future.exception())
+
 @app.route("/", methods=["GET"])
 def index():
     return render_template("index.html")
@@ -40,27 +79,16 @@ def transcribe():
         if not audio_file.filename:
             return jsonify({"error": "No selected file"}), 400
 
-        if not audio_file.filename.endswith('.wav'):
-            return jsonify({"error": "Only WAV files are supported"}), 400
+        if not audio_file.filename.lower().endswith(SUPPORTED_EXTENSIONS):
+            return jsonify({"error": f"Unsupported audio format, expected one of {', '.join(SUPPORTED_EXTENSIONS)}"}), 400
 
-        # Get temporary directories
-        raw_dir, _, _ = get_temp_dirs()
-        
-        # Save uploaded audio to temp directory
-        audio_path = os.path.join(raw_dir, audio_file.filename)
-        audio_file.save(audio_path)
-
-        # Transcribe the audio
+        # Transcribe the audio straight from the upload buffer
+        data = audio_file.read()
+        if ARCHIVE_UPLOADS:
+            archive_pool.submit(archive_upload, audio_file.filename, data).add_done_callback(log_archive_failure)
         try:
-            text = transcribe_audio(audio_path)
-            
-            # Clean up
-            os.remove(audio_path)
-            
-            return jsonify({"transcript": text})
+            return jsonify({"transcript": transcribe_audio(data)})
         except Exception as e:
-            if os.path.exists(audio_path):
-                os.remove(audio_path)
             return jsonify({"error": f"Error transcribing audio: {str(e)}"}), 500
 
     except Exception as e:
@@ -82,40 +110,36 @@ def process_audio():
         if not audio_file.filename:
             return jsonify({"error": "No selected file"}), 400
 
-        if not audio_file.filename.endswith('.wav'):
-            return jsonify({"error": "Only WAV files are supported"}), 400
+        if not audio_file.filename.lower().endswith(SUPPORTED_EXTENSIONS):
+            return jsonify({"error": f"Unsupported audio format, expected one of {', '.join(SUPPORTED_EXTENSIONS)}"}), 400
 
-        # Get temporary directories
-        raw_dir, transcript_dir, processed_dir = get_temp_dirs()
-        
-        # Save uploaded audio
-        audio_path = os.path.join(raw_dir, audio_file.filename)
-        audio_file.save(audio_path)
+        include_timings = parse_bool(request.args.get("timings", "false"))
+        if include_timings is None:
+            return jsonify({"error": "timings must be a boolean (1/0, true/false, yes/no, on/off)"}), 400
 
-        try:
-            # Validate audio file
-            y, sr = librosa.load(audio_path)
-            duration = librosa.get_duration(y=y, sr=sr)
-            if duration < 0.1:  # Less than 100ms is likely an error
-                raise ValueError("Audio file appears to be empty or corrupted. Please check the file and try again.")
+        # Analyse the upload from memory; nothing is written to disk on the request path
+        data = audio_file.read()
+        if ARCHIVE_UPLOADS:
+            archive_pool.submit(archive_upload, audio_file.filename, data, transcript).add_done_callback(log_archive_failure)
 
-            # Save transcript
-            text_path = os.path.join(transcript_dir, audio_file.filename.replace(".wav", ".txt"))
-            with open(text_path, "w", encoding="utf-8") as f:
-                f.write(transcript)
+        with collect_timings() as timings:
+            # Decode once and validate audio file
+            audio = load_audio(data)
+            check_duration(audio)
 
             # Feature extraction
-            pause_count, pause_avg = count_pauses(audio_path)
-            hesitations, lexical_div, incomplete = extract_text_features(transcript)
+            parsed = parse_transcript(transcript)
+            pause_count, pause_avg = count_pauses(audio)
+            hesitations, lexical_div, incomplete = extract_text_features(parsed)
             semantic_sim = semantic_coherence(transcript)
-            speech_rate = len(transcript.split()) / (duration / 60)
+            rate = speech_rate(parsed, audio)
 
             rows = [{
                 "sample_id": audio_file.filename,
                 "pause_count": pause_count,
                 "pause_avg_duration": pause_avg,
-                "speech_rate": speech_rate,
-                "pitch_variability": 0,  # Placeholder
+                "speech_rate": rate,
+                "pitch_variability": pitch_variability(audio),
                 "hesitation_count": hesitations,
                 "lexical_diversity": lexical_div,
                 "incomplete_sentences": incomplete,
@@ -124,37 +148,96 @@ def process_audio():
 
             df = pd.DataFrame(rows)
             final_df = run_modeling(df)
-            
+
             # Convert numpy values to Python native types for JSON serialization
-            result_dict = final_df.to_dict(orient="records")
-            for record in result_dict:
-                for key, value in record.items():
-                    if pd.isna(value):
-                        record[key] = None
-                    elif isinstance(value, (np.integer, np.floating)):
-                        record[key] = float(value) if isinstance(value, np.floating) else int(value)
-
-            # Clean up temporary files
-            os.remove(audio_path)
-            os.remove(text_path)
-
-            return jsonify({
-                "message": "Processing complete.",
-                "data": result_dict
-            })
+            result_dict = [to_native(record) for record in final_df.to_dict(orient="records")]
 
-        except Exception as e:
-            # Clean up on error
-            if os.path.exists(audio_path):
-                os.remove(audio_path)
-            if os.path.exists(text_path):
-                os.remove(text_path)
-            raise e
+        response = {
+            "message": "Processing complete.",
+            "data": result_dict
+        }
+        if include_timings:
+            response["timings"] = timings
+        return jsonify(response)
+
+    except Exception as e:
+        traceback.print_exc()
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/batch", methods=["POST"])
+def submit_batch():
+    """Accept several `audio_files` (or one zip `archive`) and return a job id to poll.
+
+    Transcripts are optional: a `transcripts` JSON object mapping file names to text,
+    or .txt files next to the recordings in the archive. Missing ones are transcribed.
+    """
+    try:
+        transcripts = json.loads(request.form.get("transcripts", "{}"))
+    except json.JSONDecodeError as e:
+        return jsonify({"error": f"transcripts is not valid JSON: {e}"}), 400
+    if not isinstance(transcripts, dict):
+        return jsonify({"error": "transcripts must map file names to text"}), 400
+
+    work_dir = job_manager.new_work_dir()
+    try:
+        samples = []
+
+        archive = request.files.get("archive")
+        if archive and archive.filename:
+            archive_path = os.path.join(work_dir, "upload.zip")
+            archive.save(archive_path)
+            try:
+                samples = extract_archive(archive_path, work_dir)
+            except (ValueError, zipfile.BadZipFile) as e:
+                shutil.rmtree(work_dir, ignore_errors=True)
+                return jsonify({"error": f"Invalid archive: {e}"}), 400
+
+        for audio_file in request.files.getlist("audio_files"):
+            if not audio_file.filename:
+                continue
+            if not audio_file.filename.lower().endswith(SUPPORTED_EXTENSIONS):
+                shutil.rmtree(work_dir, ignore_errors=True)
+                return jsonify({"error": f"Unsupported audio format: {audio_file.filename}"}), 400
+            name = os.path.basename(audio_file.filename)
+            if any(name == sample[0] for sample in samples):
+                shutil.rmtree(work_dir, ignore_errors=True)
+                return jsonify({"error": f"Duplicate file name: {name}"}), 400
+            audio_path = os.path.join(work_dir, name)
+            audio_file.save(audio_path)
+            samples.append((name, audio_path, None))
+
+        if not samples:
+            shutil.rmtree(work_dir, ignore_errors=True)
+            return jsonify({"error": "No audio files provided"}), 400
+
+        samples = [(name, path, transcripts.get(name) or text) for name, path, text in samples]
+        job_id = job_manager.submit(samples, work_dir)
+        return jsonify({"job_id": job_id, "total": len(samples)}), 202
 
     except Exception as e:
         traceback.print_exc()
+        shutil.rmtree(work_dir, ignore_errors=True)
         return jsonify({"error": str(e)}), 500
 
+@app.route("/jobs/<job_id>", methods=["GET"])
+def job_status(job_id):
+    snapshot = job_manager.snapshot(job_id)
+    if snapshot is None:
+        return jsonify({"error": "Unknown job id"}), 404
+    return jsonify(snapshot)
+
+@app.route("/jobs/<job_id>/stream", methods=["GET"])
+def job_stream(job_id):
+    if job_manager.get(job_id) is None:
+        return jsonify({"error": "Unknown job id"}), 404
+    events = (json.dumps(event) + "\n" for event in job_manager.stream(job_id))
+    return Response(events, mimetype="application/x-ndjson")
+
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    # Per-process: with several gunicorn workers each one reports its own stages
+    return Response(render_metrics(), mimetype="text/plain; version=0.0.4")
+
 # For local development only
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=5000)
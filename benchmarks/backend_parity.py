@@ -0,0 +1,163 @@
+# benchmarks/backend_parity.py
+#
+# Accuracy and speed of the int8 / ONNX inference backends against the float32
+# torch models they replace.
+#
+#   python benchmarks/backend_parity.py                         # every backend
+#   python benchmarks/backend_parity.py --sentence-backends onnx --whisper-backends ""
+#
+# Sentence encoder: semantic_similarity of every transcript in data/transcripts,
+# reported as the mean and max absolute difference from torch.
+# Whisper: WER of each backend's transcript of data/processed/*.wav against the
+# torch transcript and, where one exists, the reference in data/transcripts.
+# Backends whose model or runtime is not available are reported as skipped.
+
+import argparse
+import glob
+import json
+import os
+import re
+import sys
+import time
+import traceback
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+TRANSCRIPT_DIR = os.path.join(ROOT, "data", "transcripts")
+AUDIO_DIR = os.path.join(ROOT, "data", "processed")
+
+
+def read_transcripts(directory):
+    texts = {}
+    for path in sorted(glob.glob(os.path.join(directory, "*.txt"))):
+        with open(path, encoding="utf-8") as f:
+            texts[os.path.splitext(os.path.basename(path))[0]] = f.read()
+    return texts
+
+
+def words(text):
+    return re.findall(r"[a-z0-9']+", text.lower())
+
+
+def wer(reference, hypothesis):
+    """Word error rate: word-level edit distance over the reference length."""
+    ref, hyp = words(reference), words(hypothesis)
+    if not ref:
+        return float(bool(hyp))
+    row = list(range(len(hyp) + 1))
+    for i, r in enumerate(ref, 1):
+        previous, row[0] = row[0], i
+        for j, h in enumerate(hyp, 1):
+            previous, row[j] = row[j], min(row[j] + 1, row[j - 1] + 1, previous + (r != h))
+    return row[-1] / len(ref)
+
+
+def model_size_mb(model):
+    """Parameter bytes of a torch model (quantized weights included), or the ONNX graph size."""
+    if hasattr(model, "model_path"):
+        return os.path.getsize(model.model_path) / 2**20
+    size = sum(t.numel() * t.element_size() for t in model.state_dict().values() if hasattr(t, "element_size"))
+    return size / 2**20
+
+
+def sentence_parity(backends, texts):
+    from src.feature_extraction import SENTENCE_MODEL_NAME, semantic_coherence_batch
+    from src.inference_backends import load_sentence_encoder
+    from src.model_registry import registry
+
+    names = list(texts)
+    results, baseline = {}, None
+    for backend in ["torch"] + [b for b in backends if b != "torch"]:
+        try:
+            start = time.perf_counter()
+            model = load_sentence_encoder(SENTENCE_MODEL_NAME, backend)
+            load_s = time.perf_counter() - start
+            registry.set("sentence_encoder", model)
+            start = time.perf_counter()
+            scores = np.asarray(semantic_coherence_batch([texts[n] for n in names], cache=None), dtype=np.float64)
+            entry = {"load_s": round(load_s, 3), "encode_s": round(time.perf_counter() - start, 3),
+                     "size_mb": round(model_size_mb(model), 1)}
+        except Exception as e:
+            results[backend] = {"skipped": f"{type(e).__name__}: {e}"}
+            traceback.print_exc(limit=1)
+            if backend == "torch":
+                break
+            continue
+        if baseline is None:
+            baseline = scores
+        else:
+            delta = np.abs(scores - baseline)
+            entry.update(mean_abs_delta=float(delta.mean()), max_abs_delta=float(delta.max()),
+                         worst=names[int(delta.argmax())])
+        results[backend] = entry
+    return results
+
+
+def whisper_parity(backends, audio_paths, references):
+    from src.inference_backends import load_whisper
+    from src.model_registry import registry
+    from src.preprocessing import WHISPER_MODEL_NAME, transcribe_audio
+
+    results, baseline = {}, None
+    for backend in ["torch"] + [b for b in backends if b != "torch"]:
+        try:
+            start = time.perf_counter()
+            model = load_whisper(WHISPER_MODEL_NAME, backend)
+            load_s = time.perf_counter() - start
+            registry.set("whisper", model)
+            start = time.perf_counter()
+            hypotheses = {os.path.splitext(os.path.basename(p))[0]: transcribe_audio(p, cache=None)
+                          for p in audio_paths}
+            entry = {"load_s": round(load_s, 3), "transcribe_s": round(time.perf_counter() - start, 3),
+                     "size_mb": round(model_size_mb(model), 1)}
+        except Exception as e:
+            results[backend] = {"skipped": f"{type(e).__name__}: {e}"}
+            traceback.print_exc(limit=1)
+            if backend == "torch":
+                break
+            continue
+        if baseline is None:
+            baseline = hypotheses
+        else:
+            entry["wer_vs_torch"] = {name: round(wer(baseline[name], text), 4) for name, text in hypotheses.items()}
+        entry["wer_vs_reference"] = {name: round(wer(references[name], text), 4)
+                                     for name, text in hypotheses.items() if name in references}
+        results[backend] = entry
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the int8/ONNX inference backends against torch.")
+    parser.add_argument("--sentence-backends", default="int8,onnx", help="Comma-separated; empty to skip")
+    parser.add_argument("--whisper-backends", default="int8", help="Comma-separated; empty to skip")
+    parser.add_argument("--transcripts", default=TRANSCRIPT_DIR)
+    parser.add_argument("--audio-dir", default=AUDIO_DIR)
+    parser.add_argument("--output", default=os.path.join(RESULTS_DIR, "backend_parity.json"))
+    args = parser.parse_args()
+
+    texts = read_transcripts(args.transcripts)
+    results = {}
+    sentence_backends = [b for b in args.sentence_backends.split(",") if b]
+    if sentence_backends:
+        results["sentence_encoder"] = sentence_parity(sentence_backends, texts)
+    whisper_backends = [b for b in args.whisper_backends.split(",") if b]
+    if whisper_backends:
+        audio_paths = sorted(glob.glob(os.path.join(args.audio_dir, "*.wav")))
+        results["whisper"] = whisper_parity(whisper_backends, audio_paths, texts)
+
+    for model, backends in results.items():
+        for backend, entry in backends.items():
+            print(f"{model:18s} {backend:6s} {json.dumps(entry)}")
+
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+# benchmarks/import_time.py
+#
+# Measures cold import time and peak RSS of each entry point in a fresh interpreter:
+#   python benchmarks/import_time.py [--repeat 3]
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# streamlit_app.py runs its UI at import, so measure the modules it imports instead
+ENTRY_POINTS = {
+    "app.py": "import app",
+    "src/api.py": "import src.api",
+    "streamlit_app.py": "import src.feature_extraction, src.preprocessing, src.modeling",
+    "run_pipeline.py": "import run_pipeline",
+}
+
+PROBE = """
+import resource, time
+start = time.perf_counter()
+{stmt}
+elapsed = time.perf_counter() - start
+print(elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+"""
+
+
+def measure(stmt, repeat):
+    times, rss = [], []
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, "-c", PROBE.format(stmt=stmt)], cwd=ROOT,
+                             capture_output=True, text=True, check=True)
+        elapsed, maxrss = out.stdout.split()[-2:]
+        times.append(float(elapsed))
+        rss.append(int(maxrss) / 1024)  # ru_maxrss is in KiB on Linux
+    return {"import_seconds": min(times), "peak_rss_mb": max(rss)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    results = {}
+    for name, stmt in ENTRY_POINTS.items():
+        try:
+            results[name] = measure(stmt, args.repeat)
+        except subprocess.CalledProcessError as e:
+            results[name] = {"error": e.stderr.strip().splitlines()[-1]}
+        print(f"{name:20s} {results[name]}")
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+# benchmarks/pitch_benchmark.py
+#
+# Throughput of the pitch_variability extractor on synthetic voiced speech:
+#   python benchmarks/pitch_benchmark.py [--seconds 60] [--accurate]
+#
+# Target: the default YIN path processes at least TARGET_REALTIME_FACTOR seconds
+# of audio per second of CPU time, so it adds well under 1% to request latency.
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.audio import AudioContext, TARGET_SR  # noqa: E402
+from src.pitch import pitch_variability  # noqa: E402
+from benchmarks.synthetic import synthetic_speech  # noqa: E402
+
+TARGET_REALTIME_FACTOR = 100.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--seconds", type=float, default=60.0)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--accurate", action="store_true", help="Benchmark the pyin accuracy mode instead")
+    args = parser.parse_args()
+
+    audio = AudioContext(synthetic_speech(args.seconds), TARGET_SR)
+    audio.speech_intervals()  # Shared with count_pauses in production, so not timed here
+    pitch_variability(audio, accurate=args.accurate)  # Warm-up
+
+    timings = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        value = pitch_variability(audio, accurate=args.accurate)
+        timings.append(time.perf_counter() - start)
+
+    factor = args.seconds / min(timings)
+    print(f"pitch_variability={value:.3f} st, best {min(timings) * 1000:.1f} ms "
+          f"for {args.seconds:.0f} s of audio ({factor:.0f}x realtime)")
+    if not args.accurate and factor < TARGET_REALTIME_FACTOR:
+        print(f"FAIL: below the {TARGET_REALTIME_FACTOR:.0f}x realtime target")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,385 @@
+# benchmarks/run_benchmarks.py
+#
+# Offline end-to-end benchmark suite. Generates a deterministic synthetic corpus,
+# times each processing stage and the full per-sample pipeline, and writes
+# machine-readable results that can be compared against a stored baseline.
+#
+#   python benchmarks/run_benchmarks.py                      # run and write results
+#   python benchmarks/run_benchmarks.py --save-baseline      # also store as the baseline
+#   python benchmarks/run_benchmarks.py --compare            # fail on regressions vs baseline
+#   python benchmarks/run_benchmarks.py --only count_pauses,run_modeling
+#
+# Stages that need a model which is not available offline (Whisper, MiniLM) or an
+# optional web framework are reported as skipped rather than failing the run.
+
+import argparse
+import io
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import shutil
+import sys
+import tempfile
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.synthetic import (  # noqa: E402
+    bundled_transcripts, synthetic_feature_frame, synthetic_transcripts, write_wav_corpus,
+)
+
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+BASELINE_PATH = os.path.join(ROOT, "benchmarks", "baseline.json")
+CORPUS_DIR = os.path.join(tempfile.gettempdir(), "vcd-benchmark-corpus")
+REGRESSION_TOLERANCE = 0.25  # p50 may be up to 25% slower than the baseline
+
+
+class Skip(Exception):
+    pass
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KiB on Linux
+
+
+def measure(func, items, repeat=1, warmup=1, units=None):
+    """Time func(item) for each item, repeat times; returns latency stats and throughput.
+
+    units(item) gives the work size of an item (e.g. seconds of audio) for throughput;
+    by default throughput is items per second.
+    """
+    for item in items[:warmup]:
+        func(item)
+    latencies, total_units = [], 0.0
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for item in items:
+            t0 = time.perf_counter()
+            func(item)
+            latencies.append(time.perf_counter() - t0)
+            total_units += units(item) if units else 1
+    elapsed = time.perf_counter() - start
+    latencies = np.array(latencies) * 1000
+    return {
+        "n": len(latencies),
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p90_ms": float(np.percentile(latencies, 90)),
+        "p99_ms": float(np.percentile(latencies, 99)),
+        "mean_ms": float(latencies.mean()),
+        "throughput_per_s": total_units / elapsed if elapsed else 0.0,
+        "throughput_unit": "audio_seconds" if units else "items",
+    }
+
+
+# --- Stages ---
+
+def bench_load_audio(corpus, repeat):
+    from src.audio import load_audio
+    results = {}
+    for length, paths in corpus.items():
+        results[f"{length}s"] = measure(load_audio, paths, repeat, units=lambda _, n=length: n)
+    return results
+
+
+def bench_count_pauses(corpus, repeat):
+    from src.audio import load_audio
+    from src.feature_extraction import count_pauses
+    results = {}
+    for length, paths in corpus.items():
+        # Fresh contexts so the memoized activity is recomputed on every call
+        audio = [load_audio(path) for path in paths]
+        results[f"{length}s"] = measure(lambda a: count_pauses(type(a)(a.y, a.sr)), audio, repeat,
+                                        units=lambda _, n=length: n)
+    return results
+
+
+def bench_pitch_variability(corpus, repeat):
+    from src.audio import load_audio
+    from src.pitch import pitch_variability
+    results = {}
+    for length, paths in corpus.items():
+        audio = [load_audio(path) for path in paths]
+        for a in audio:
+            a.activity()
+        results[f"{length}s"] = measure(pitch_variability, audio, repeat, units=lambda _, n=length: n)
+    return results
+
+
+def bench_extract_text_features(texts, repeat):
+    from src.feature_extraction import extract_text_features, extract_text_features_batch
+    from src.transcript import ParsedTranscript
+    # Parse afresh each time so the per-text parse cache does not hide tokenization cost
+    return {
+        "transcript": measure(lambda text: extract_text_features(ParsedTranscript(text)), texts, repeat),
+        "corpus": measure(extract_text_features_batch, [texts], repeat, units=len),
+    }
+
+
+def bench_semantic_coherence(texts, repeat):
+    try:
+        from src.feature_extraction import semantic_coherence, semantic_coherence_batch, get_sentence_model
+        get_sentence_model()
+    except Exception as e:
+        raise Skip(f"sentence encoder unavailable: {e}")
+    return {
+        # cache=None so the encoder runs every time
+        "single": measure(lambda t: semantic_coherence_batch([t], cache=None), texts, repeat),
+        "batch_of_32": measure(lambda batch: semantic_coherence_batch(batch, cache=None),
+                               [texts[i:i + 32] for i in range(0, len(texts), 32)], repeat),
+        "cached": measure(semantic_coherence, texts, repeat),
+    }
+
+
+def bench_run_modeling(repeat):
+    from src.modeling import fit_population_model, run_modeling, compute_risk_scores
+    results = {}
+    reference = synthetic_feature_frame(2000, seed=1)
+    model = fit_population_model(reference)
+    for n in (1, 100, 10000):
+        frame = synthetic_feature_frame(n)
+        results[f"served_{n}"] = measure(lambda df: run_modeling(df.copy(), model), [frame], repeat * 5)
+        results[f"risk_scores_{n}"] = measure(compute_risk_scores, [frame], repeat * 5)
+    results["fit_2000"] = measure(fit_population_model, [reference], repeat)
+    return results
+
+
+def bench_transcribe_audio(corpus, repeat):
+    try:
+        from src.preprocessing import transcribe_audio, get_whisper_model
+        get_whisper_model()
+    except Exception as e:
+        raise Skip(f"Whisper unavailable: {e}")
+    paths = corpus[min(corpus)]
+    units = lambda _, n=min(corpus): n  # noqa: E731
+    return {
+        f"{min(corpus)}s": measure(lambda p: transcribe_audio(p, cache=None, vad=False), paths, repeat, units=units),
+        f"{min(corpus)}s_vad": measure(lambda p: transcribe_audio(p, cache=None, vad=True), paths, repeat, units=units),
+    }
+
+
+def bench_pipeline(corpus, texts, repeat):
+    """Per-sample path shared by the endpoints: decode, audio and text features, scoring."""
+    import pandas as pd
+    from src.audio import load_audio
+    from src.feature_extraction import count_pauses, extract_text_features, speech_rate
+    from src.modeling import fit_population_model, run_modeling
+    from src.pitch import pitch_variability
+
+    model = fit_population_model(synthetic_feature_frame(500, seed=2))
+    try:
+        from src.feature_extraction import semantic_coherence, get_sentence_model
+        get_sentence_model()
+    except Exception:
+        semantic_coherence = None
+
+    def process(item):
+        path, text = item
+        audio = load_audio(path)
+        pause_count, pause_avg = count_pauses(audio)
+        hesitations, lexical_div, incomplete = extract_text_features(text)
+        row = {
+            "sample_id": os.path.basename(path), "pause_count": pause_count, "pause_avg_duration": pause_avg,
+            "speech_rate": speech_rate(text, audio), "pitch_variability": pitch_variability(audio),
+            "hesitation_count": hesitations, "lexical_diversity": lexical_div,
+            "incomplete_sentences": incomplete,
+            "semantic_similarity": semantic_coherence(text) if semantic_coherence else 0.0,
+        }
+        return run_modeling(pd.DataFrame([row]), model)
+
+    results = {}
+    for length, paths in corpus.items():
+        items = list(zip(paths, texts))
+        results[f"{length}s"] = measure(process, items, repeat, units=lambda _, n=length: n)
+    results["includes_semantic_coherence"] = semantic_coherence is not None
+    return results
+
+
+def isolate_app_state(state_dir):
+    """Point the apps' writable state at state_dir; must run before app or src.api is imported.
+
+    Otherwise a run archives its uploads into data/ (where bundled_transcripts would pick
+    them up next time), writes benchmark rows to the real feature store and may refit
+    models/population.joblib. Each stage runs in a fresh process, so nothing is imported yet.
+    """
+    os.environ.update({
+        "VCD_ARCHIVE_UPLOADS": "0",
+        "VCD_FEATURE_STORE": os.path.join(state_dir, "feature_store"),
+        "VCD_POPULATION_MODEL": os.path.join(state_dir, "population.joblib"),
+        "VCD_POPULATION_REFIT_INTERVAL": "0",
+    })
+    from src.modeling import fit_population_model, save_population_model
+    # Serve from a trained model, as production does
+    save_population_model(fit_population_model(synthetic_feature_frame(500, seed=2)),
+                          os.environ["VCD_POPULATION_MODEL"])
+
+
+def bench_endpoints(corpus, texts, repeat):
+    state_dir = tempfile.mkdtemp(prefix="vcd-benchmark-state-")
+    try:
+        isolate_app_state(state_dir)
+        return _bench_endpoints(corpus, texts, repeat)
+    finally:
+        shutil.rmtree(state_dir, ignore_errors=True)
+
+
+def _bench_endpoints(corpus, texts, repeat):
+    path = corpus[min(corpus)][0]
+    with open(path, "rb") as f:
+        audio_bytes = f.read()
+    results = {}
+    try:
+        import app as flask_app
+        client = flask_app.app.test_client()
+
+        def flask_request(text):
+            data = {"audio_file": (io.BytesIO(audio_bytes), "bench.wav"), "transcript": text}
+            response = client.post("/process_audio", data=data, content_type="multipart/form-data")
+            if response.status_code != 200:
+                raise RuntimeError(response.get_json())
+
+        results["flask_process_audio"] = measure(flask_request, texts[:5], repeat)
+    except Exception as e:
+        results["flask_process_audio"] = {"skipped": str(e)}
+    try:
+        from fastapi.testclient import TestClient
+        import src.api as fastapi_app
+        with TestClient(fastapi_app.app) as client:
+            def fastapi_request(text):
+                files = {"audio_file": ("bench.wav", audio_bytes, "audio/wav")}
+                response = client.post("/process_audio/", files=files, data={"transcript": text})
+                if response.status_code != 200:
+                    raise RuntimeError(response.text)
+
+            results["fastapi_process_audio"] = measure(fastapi_request, texts[:5], repeat)
+    except Exception as e:
+        results["fastapi_process_audio"] = {"skipped": str(e)}
+    return results
+
+
+STAGES = {
+    "load_audio": lambda corpus, texts, repeat: bench_load_audio(corpus, repeat),
+    "count_pauses": lambda corpus, texts, repeat: bench_count_pauses(corpus, repeat),
+    "pitch_variability": lambda corpus, texts, repeat: bench_pitch_variability(corpus, repeat),
+    "extract_text_features": lambda corpus, texts, repeat: bench_extract_text_features(texts, repeat),
+    "semantic_coherence": lambda corpus, texts, repeat: bench_semantic_coherence(texts, repeat),
+    "run_modeling": lambda corpus, texts, repeat: bench_run_modeling(repeat),
+    "transcribe_audio": lambda corpus, texts, repeat: bench_transcribe_audio(corpus, 1),
+    "pipeline": lambda corpus, texts, repeat: bench_pipeline(corpus, texts, repeat),
+    "endpoints": lambda corpus, texts, repeat: bench_endpoints(corpus, texts, repeat),
+}
+
+
+def run_stage(name, corpus, texts, repeat):
+    """Run one stage and attach its peak RSS; runs in its own process, so the peak is the stage's own."""
+    try:
+        result = STAGES[name](corpus, texts, repeat)
+    except Skip as e:
+        result = {"skipped": str(e)}
+    except Exception as e:
+        traceback.print_exc()
+        result = {"error": str(e)}
+    result["peak_rss_mb"] = peak_rss_mb()
+    return result
+
+
+def run_suite(only=None, repeat=3, lengths=(10, 60, 300)):
+    corpus = write_wav_corpus(CORPUS_DIR, lengths=lengths)
+    texts = bundled_transcripts() + synthetic_transcripts(54)
+    results = {}
+    for name in STAGES:
+        if only and name not in only:
+            continue
+        print(f"-- {name}", flush=True)
+        # A fresh spawned process per stage: ru_maxrss is a process-wide high-water mark,
+        # so in one process every stage after the first heavy one would report its peak
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+            try:
+                results[name] = pool.submit(run_stage, name, corpus, texts, repeat).result()
+            except BrokenProcessPool as e:
+                results[name] = {"error": f"stage process died: {e}"}
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "repeat": repeat,
+            "lengths": list(lengths),
+        },
+        "stages": results,
+    }
+
+
+def compare(results, baseline, tolerance=REGRESSION_TOLERANCE):
+    """List (stage, case, baseline p50, current p50) for cases slower than the tolerance allows."""
+    regressions = []
+    for stage, cases in results["stages"].items():
+        for case, stats in cases.items():
+            base = baseline.get("stages", {}).get(stage, {}).get(case)
+            if not isinstance(stats, dict) or not isinstance(base, dict):
+                continue
+            if "p50_ms" in stats and "p50_ms" in base and stats["p50_ms"] > base["p50_ms"] * (1 + tolerance):
+                regressions.append((stage, case, base["p50_ms"], stats["p50_ms"]))
+    return regressions
+
+
+def print_table(results):
+    for stage, cases in results["stages"].items():
+        for case, stats in cases.items():
+            if isinstance(stats, dict) and "p50_ms" in stats:
+                print(f"{stage:24s} {case:24s} p50 {stats['p50_ms']:9.2f} ms  p90 {stats['p90_ms']:9.2f} ms  "
+                      f"{stats['throughput_per_s']:10.1f} {stats['throughput_unit']}/s")
+            elif case != "peak_rss_mb":
+                print(f"{stage:24s} {case:24s} {stats}")
+        if "peak_rss_mb" in cases:
+            print(f"{stage:24s} {'peak_rss':24s} {cases['peak_rss_mb']:.0f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the offline benchmark suite.")
+    parser.add_argument("--only", help="Comma-separated stage names to run")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--lengths", default="10,60,300", help="Synthetic WAV lengths in seconds")
+    parser.add_argument("--output", default=os.path.join(RESULTS_DIR, "latest.json"))
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--compare", action="store_true", help="Exit non-zero if any p50 regressed vs the baseline")
+    parser.add_argument("--tolerance", type=float, default=REGRESSION_TOLERANCE)
+    args = parser.parse_args()
+
+    only = set(args.only.split(",")) if args.only else None
+    lengths = tuple(int(x) for x in args.lengths.split(","))
+    results = run_suite(only, args.repeat, lengths)
+    print_table(results)
+
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Wrote {args.output}")
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Saved baseline to {args.baseline}")
+
+    if args.compare:
+        if not os.path.exists(args.baseline):
+            sys.exit(f"No baseline at {args.baseline}; run with --save-baseline first")
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for stage, case, base, current in regressions:
+            print(f"REGRESSION {stage}/{case}: p50 {base:.2f} ms -> {current:.2f} ms")
+        if regressions:
+            sys.exit(1)
+        print("No regressions against the baseline.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,9 @@
+# gunicorn.conf.py
+
+import os
+
+# With VCD_PRELOAD_APP=1 the app module (and any models named in VCD_PRELOAD_MODELS)
+# is imported once in the master before forking, so workers share that memory
+# copy-on-write instead of each loading their own copy. The worker count is left to
+# gunicorn (WEB_CONCURRENCY, or 1): every worker adds its own model memory.
+preload_app = os.environ.get("VCD_PRELOAD_APP", "0") == "1"
@@ -1,58 +1,153 @@
 # run_pipeline.py
 
+import argparse
 import os
 import pandas as pd
-from src.preprocessing import preprocess_audio_dir
-from src.feature_extraction import count_pauses, extract_text_features, semantic_coherence
-from src.modeling import run_modeling
-from src.visualization import save_all_plots  # NEW
-import librosa
+from src.preprocessing import normalize_audio, transcribe_audio
+from src.feature_extraction import count_pauses, extract_text_features, semantic_coherence_batch, speech_rate, embedding_cache
+from src.modeling import run_modeling, fit_population_model, save_population_model, MODEL_PATH, MIN_SAMPLES, FEATURE_COLUMNS
+from src.visualization import save_all_plots, PLOT_COLUMNS  # NEW
+from src.feature_store import FeatureStore, content_hash
+from src.pitch import pitch_variability
+from src.audio import SUPPORTED_EXTENSIONS
+from src.transcript import ParsedTranscript, parse_transcripts
+from src.pipeline import run_parallel
 
 RAW_DIR = "data/raw"
 PROCESSED_DIR = "data/processed"
 TRANSCRIPT_DIR = "data/transcripts"
 OUTPUT_CSV = os.path.join(PROCESSED_DIR, "features_output.csv")
+EMBEDDING_CACHE = os.path.join(PROCESSED_DIR, "embedding_cache.npz")
+MANIFEST = os.path.join(PROCESSED_DIR, "manifest.jsonl")
 PLOTS_DIR = "plots"
 
-def main():
-    os.makedirs(PLOTS_DIR, exist_ok=True)
+def read_text(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
 
-    preprocess_audio_dir(RAW_DIR, PROCESSED_DIR, TRANSCRIPT_DIR)
-    
-    rows = []
+def recording_sources():
+    """Processed WAV name -> the file it comes from: the raw recording, or for WAVs with no
+    raw source (such as the bundled corpus) the processed WAV itself."""
+    sources = {}
+    if os.path.isdir(RAW_DIR):
+        for fname in os.listdir(RAW_DIR):
+            if fname.lower().endswith(SUPPORTED_EXTENSIONS):
+                sources[os.path.splitext(fname)[0] + ".wav"] = os.path.join(RAW_DIR, fname)
     for fname in os.listdir(PROCESSED_DIR):
         if fname.endswith(".wav"):
-            audio_path = os.path.join(PROCESSED_DIR, fname)
-            text_path = os.path.join(TRANSCRIPT_DIR, fname.replace(".wav", ".txt"))
-
-            with open(text_path) as f:
-                transcript = f.read()
-
-            pause_count, pause_avg = count_pauses(audio_path)
-            hesitations, lexical_div, incomplete = extract_text_features(transcript)
-            semantic_sim = semantic_coherence(transcript)
-            speech_rate = len(transcript.split()) / (librosa.get_duration(path=audio_path) / 60)
-
-            rows.append({
-                "sample_id": fname,
-                "pause_count": pause_count,
-                "pause_avg_duration": pause_avg,
-                "speech_rate": speech_rate,
-                "pitch_variability": 0,  # Placeholder
-                "hesitation_count": hesitations,
-                "lexical_diversity": lexical_div,
-                "incomplete_sentences": incomplete,
-                "semantic_similarity": semantic_sim
-            })
+            sources.setdefault(fname, os.path.join(PROCESSED_DIR, fname))
+    return sources
+
+def extract_sequential(store):
+    """Features of every recording; new or changed ones are decoded once, unchanged ones not at all.
+
+    A recording is unchanged when the stored content hash of its source file and transcript
+    still matches, which is checked before anything is decoded or transcribed. Otherwise
+    the one decode is normalized to the processed WAV, transcribed and used for the audio features.
+    """
+    os.makedirs(PROCESSED_DIR, exist_ok=True)
+    os.makedirs(TRANSCRIPT_DIR, exist_ok=True)
+    known = store.read(columns=FEATURE_COLUMNS + ["content_hash"]).set_index("sample_id")
+
+    rows = []
+    transcripts = []
+    hashes = []
+    for fname, source in sorted(recording_sources().items()):
+        wav_path = os.path.join(PROCESSED_DIR, fname)
+        text_path = os.path.join(TRANSCRIPT_DIR, os.path.splitext(fname)[0] + ".txt")
+        transcript = read_text(text_path)
+
+        # Unchanged recordings reuse their stored features without being decoded
+        if (transcript is not None and fname in known.index and os.path.exists(wav_path)
+                and known.at[fname, "content_hash"] == content_hash(source, transcript)):
+            rows.append({"sample_id": fname, **known.loc[fname, FEATURE_COLUMNS].to_dict()})
+            transcripts.append(ParsedTranscript(transcript))
+            hashes.append(known.at[fname, "content_hash"])
+            continue
+
+        # One decode feeds the processed WAV, Whisper and the audio features
+        from_raw = source != wav_path
+        audio = normalize_audio(source, wav_path if from_raw else None)
+        if from_raw or transcript is None:
+            transcript = transcribe_audio(audio)
+            with open(text_path, "w", encoding="utf-8") as f:
+                f.write(transcript)
+
+        # Parsed once; text features, speech rate and coherence all reuse the tokenization
+        parsed = ParsedTranscript(transcript)
+        transcripts.append(parsed)
+        hashes.append(content_hash(source, transcript))
+
+        pause_count, pause_avg = count_pauses(audio)
+        hesitations, lexical_div, incomplete = extract_text_features(parsed)
+        rows.append({
+            "sample_id": fname,
+            "pause_count": pause_count,
+            "pause_avg_duration": pause_avg,
+            "speech_rate": speech_rate(parsed, audio),
+            "pitch_variability": pitch_variability(audio),
+            "hesitation_count": hesitations,
+            "lexical_diversity": lexical_div,
+            "incomplete_sentences": incomplete
+        })
+    return rows, transcripts, hashes
+
+def extract_parallel(workers, torch_threads):
+    results = run_parallel(RAW_DIR, PROCESSED_DIR, TRANSCRIPT_DIR, MANIFEST,
+                           workers=workers, torch_threads=torch_threads)
+    transcripts = parse_transcripts([transcript for transcript, _ in results])
+    rows = [dict(features) for _, features in results]
+    hashes = [content_hash(os.path.join(PROCESSED_DIR, row["sample_id"]), parsed.text)
+              for row, parsed in zip(rows, transcripts)]
+    return rows, transcripts, hashes
+
+def main(workers=0, torch_threads=1):
+    os.makedirs(PLOTS_DIR, exist_ok=True)
+    embedding_cache.load(EMBEDDING_CACHE)
+    store = FeatureStore()
+
+    if workers > 0:
+        rows, transcripts, hashes = extract_parallel(workers, torch_threads)
+    else:
+        rows, transcripts, hashes = extract_sequential(store)
+
+    # Score all new transcripts in one encoder batch
+    pending = [i for i, row in enumerate(rows) if "semantic_similarity" not in row]
+    scores = semantic_coherence_batch([transcripts[i] for i in pending])
+    for i, semantic_sim in zip(pending, scores):
+        rows[i]["semantic_similarity"] = semantic_sim
+    embedding_cache.save(EMBEDDING_CACHE)
 
     df = pd.DataFrame(rows)
-    final_df = run_modeling(df)
-    final_df.to_csv(OUTPUT_CSV, index=False)
-    print(f"Saved features to {OUTPUT_CSV}")
+
+    # Fit the population models once on the reference corpus; serving only scores against them
+    if len(df) >= MIN_SAMPLES:
+        population_model = fit_population_model(df)
+        save_population_model(population_model)
+        print(f"Saved population model to {MODEL_PATH}")
+    else:
+        # Too few samples for a meaningful reference: score against the previous model, if any
+        population_model = None
+        print(f"Only {len(df)} sample(s), fewer than {MIN_SAMPLES}; kept the existing population model")
+
+    final_df = run_modeling(df, population_model)
+    store.upsert(final_df, hashes)
+    store.compact()
+    store.export_csv(OUTPUT_CSV)
+    print(f"Saved features to {store.root} and {OUTPUT_CSV}")
 
     # Save visualizations
-    save_all_plots(final_df, PLOTS_DIR)
-    print(f"Saved visualizations to {PLOTS_DIR}")
+    redrawn = save_all_plots(store.read(columns=PLOT_COLUMNS), PLOTS_DIR)
+    print(f"Saved visualizations to {PLOTS_DIR} (redrawn: {', '.join(redrawn) or 'none, inputs unchanged'})")
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Run the voice feature extraction pipeline.")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="Worker processes for the resumable pipeline mode over data/raw (0 = sequential)")
+    parser.add_argument("--torch-threads", type=int, default=1,
+                        help="Torch intra-op threads per worker")
+    args = parser.parse_args()
+    main(workers=args.workers, torch_threads=args.torch_threads)
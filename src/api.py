@@ -1,68 +1,284 @@
 from fastapi import FastAPI, UploadFile, File, Form, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, FileResponse, PlainTextResponse, StreamingResponse
+from typing import List, Optional
+import asyncio
+import json
+import multiprocessing
 import os
 import pandas as pd
 import shutil
 import traceback
-from src.feature_extraction import count_pauses, extract_text_features, semantic_coherence
-from src.modeling import run_modeling
-import librosa
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from src.feature_extraction import extract_text_features
+from src.inference_service import semantic_coherence
+from src.modeling import FEATURE_COLUMNS, refit_in_background, run_modeling
+from src.model_registry import preload_from_env
+from src.instrumentation import collect_timings, in_context, record, render_metrics
+from src.audio import SUPPORTED_EXTENSIONS
+from src.feature_store import FeatureStore, content_hash
+from src.jobs import job_manager, extract_archive
+from src.pipeline import upload_audio_features
 
 app = FastAPI()
 
+# Models load lazily on first use; VCD_PRELOAD_MODELS warms them up at import instead
+preload_from_env()
+
 RAW_DIR = "data/raw"
 TRANSCRIPT_DIR = "data/transcripts"
 PROCESSED_DIR = "data/processed"
 OUTPUT_CSV = os.path.join(PROCESSED_DIR, "features_output.csv")
 
+# Concurrency limits: requests beyond MAX_CONCURRENCY wait in a queue of MAX_QUEUE;
+# a full queue is rejected with 429, and waiting longer than QUEUE_TIMEOUT gives 503
+MAX_CONCURRENCY = int(os.environ.get("VCD_API_MAX_CONCURRENCY", os.cpu_count() or 2))
+MAX_QUEUE = int(os.environ.get("VCD_API_MAX_QUEUE", 32))
+QUEUE_TIMEOUT = float(os.environ.get("VCD_API_QUEUE_TIMEOUT", 30))
+CPU_WORKERS = int(os.environ.get("VCD_API_CPU_WORKERS", os.cpu_count() or 2))
+IO_WORKERS = int(os.environ.get("VCD_API_IO_WORKERS", 8))
+UPLOAD_CHUNK_SIZE = 1 << 20
+# Uploads are analysed from memory; archiving them to RAW_DIR/TRANSCRIPT_DIR for later
+# pipeline runs happens in the background and can be turned off
+ARCHIVE_UPLOADS = os.environ.get("VCD_ARCHIVE_UPLOADS", "1") != "0"
+
 os.makedirs(RAW_DIR, exist_ok=True)
 os.makedirs(TRANSCRIPT_DIR, exist_ok=True)
 os.makedirs(PROCESSED_DIR, exist_ok=True)
 
+feature_store = FeatureStore()
+
+cpu_pool = None  # librosa decoding, pause detection and pitch tracking
+io_pool = None  # file writes, sentence encoder, modeling and feature store
+admission = None
+waiting = 0
+
+
+@app.on_event("startup")
+async def start_executors():
+    global cpu_pool, io_pool, admission
+    cpu_pool = new_cpu_pool()
+    io_pool = ThreadPoolExecutor(max_workers=IO_WORKERS, thread_name_prefix="api-io")
+    admission = asyncio.Semaphore(MAX_CONCURRENCY)
+
+
+@app.on_event("shutdown")
+async def stop_executors():
+    cpu_pool.shutdown(wait=False, cancel_futures=True)
+    io_pool.shutdown(wait=False, cancel_futures=True)
+
+
+async def acquire_slot():
+    global waiting
+    if admission.locked() and waiting >= MAX_QUEUE:
+        raise HTTPException(status_code=429, detail="Too many requests in flight, retry later.")
+    waiting += 1
+    try:
+        await asyncio.wait_for(admission.acquire(), timeout=QUEUE_TIMEOUT)
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=503, detail="Server busy, timed out waiting for a processing slot.")
+    finally:
+        waiting -= 1
+
+
+async def run_in(pool, func, *args):
+    return await asyncio.get_running_loop().run_in_executor(pool, func, *args)
+
+
+def new_cpu_pool():
+    # Spawned rather than forked: the server has threads running and may have torch
+    # loaded (VCD_PRELOAD_MODELS). Workers only import src.pipeline, not this app.
+    return ProcessPoolExecutor(max_workers=CPU_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+
+
+async def run_in_cpu_pool(func, *args):
+    """Run func on the CPU pool, replacing the pool if a worker died (e.g. OOM on a large
+    upload) so that only the requests in flight on it fail."""
+    global cpu_pool
+    pool = cpu_pool
+    try:
+        return await run_in(pool, func, *args)
+    except BrokenProcessPool:
+        if cpu_pool is pool:
+            cpu_pool = new_cpu_pool()
+            pool.shutdown(wait=False, cancel_futures=True)
+        raise HTTPException(status_code=503, detail="An audio worker crashed, retry the request.")
+
+
+async def save_upload(upload: UploadFile, path: str):
+    # Stream the upload in chunks; disk writes happen on the I/O pool, not the event loop
+    f = await run_in(io_pool, open, path, "wb")
+    try:
+        while chunk := await upload.read(UPLOAD_CHUNK_SIZE):
+            await run_in(io_pool, f.write, chunk)
+    finally:
+        await run_in(io_pool, f.close)
+
+
+def write_text(path, text):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+
+
+def archive_upload(audio_path, data, text_path, transcript):
+    with open(audio_path, "wb") as f:
+        f.write(data)
+    write_text(text_path, transcript)
+
+
+def log_archive_failure(future):
+    # Archival is never awaited, so report its errors here instead of losing them
+    if not future.cancelled() and future.exception() is not None:
+        print("Failed to archive upload:")
+        traceback.print_exception(future.exception())
+
+
+def text_features(transcript):
+    hesitations, lexical_div, incomplete = extract_text_features(transcript)
+    return hesitations, lexical_div, incomplete, semantic_coherence(transcript)
+
+
+def upload_sample_id(filename, digest):
+    # Client filenames are not unique (many uploads are "audio.wav"), and the store keeps the
+    # latest row per sample_id, so stored uploads are keyed by content as well
+    return f"{digest[:16]}/{filename}"
+
+
+def score_and_store(rows, data, transcript):
+    final_df = run_modeling(pd.DataFrame(rows))
+    digest = content_hash(data, transcript)
+    stored = final_df.assign(sample_id=[upload_sample_id(name, digest) for name in final_df["sample_id"]])
+    feature_store.upsert(stored, [digest])
+    refit_in_background(lambda: feature_store.read(columns=FEATURE_COLUMNS))
+    return final_df.to_dict(orient="records")
+
+
 @app.post("/process_audio/")
-async def process_audio(audio_file: UploadFile = File(...), transcript: str = Form(...)):
+async def process_audio(audio_file: UploadFile = File(...), transcript: str = Form(...), timings: bool = False):
+    await acquire_slot()
+    try:
+        with collect_timings() as stage_timings:
+            return await _process_audio(audio_file, transcript, stage_timings if timings else None)
+    finally:
+        admission.release()
+
+
+async def _process_audio(audio_file, transcript, timings):
     try:
-        # Save uploaded audio
-        audio_path = os.path.join(RAW_DIR, audio_file.filename)
-        with open(audio_path, "wb") as buffer:
-            shutil.copyfileobj(audio_file.file, buffer)
-
-        # Save transcript
-        text_path = os.path.join(TRANSCRIPT_DIR, audio_file.filename.replace(".wav", ".txt"))
-        with open(text_path, "w", encoding="utf-8") as f:
-            f.write(transcript)
-
-        # Feature extraction
-        pause_count, pause_avg = count_pauses(audio_path)
-        hesitations, lexical_div, incomplete = extract_text_features(transcript)
-        semantic_sim = semantic_coherence(transcript)
-        duration = librosa.get_duration(filename=audio_path)
-        if duration == 0:
-            raise ValueError("Audio file has zero duration.")
-
-        speech_rate = len(transcript.split()) / (duration / 60)
+        filename = os.path.basename(audio_file.filename)
+        data = await audio_file.read()
+        if ARCHIVE_UPLOADS:
+            # Scheduled but not awaited: the response never waits on disk
+            text_path = os.path.join(TRANSCRIPT_DIR, os.path.splitext(filename)[0] + ".txt")
+            archived = asyncio.get_running_loop().run_in_executor(
+                io_pool, archive_upload, os.path.join(RAW_DIR, filename), data, text_path, transcript)
+            archived.add_done_callback(log_archive_failure)
+
+        # Audio and text features run concurrently off the event loop
+        ((pause_count, pause_avg, rate, pitch), worker_timings), (hesitations, lexical_div, incomplete, semantic_sim) = await asyncio.gather(
+            run_in_cpu_pool(upload_audio_features, data, transcript),
+            run_in(io_pool, in_context(text_features), transcript),
+        )
+        for stage, seconds in worker_timings.items():
+            record(stage, seconds)
 
         rows = [{
-            "sample_id": audio_file.filename,
+            "sample_id": filename,
             "pause_count": pause_count,
             "pause_avg_duration": pause_avg,
-            "speech_rate": speech_rate,
-            "pitch_variability": 0,  # Placeholder
+            "speech_rate": rate,
+            "pitch_variability": pitch,
             "hesitation_count": hesitations,
             "lexical_diversity": lexical_div,
             "incomplete_sentences": incomplete,
             "semantic_similarity": semantic_sim
         }]
 
-        df = pd.DataFrame(rows)
-        final_df = run_modeling(df)
-        final_df.to_csv(OUTPUT_CSV, index=False)
-
-        return JSONResponse({
+        response = {
             "message": "Processing complete.",
-            "data": final_df.to_dict(orient="records")
-        })
+            "data": await run_in(io_pool, in_context(score_and_store), rows, data, transcript)
+        }
+        if timings is not None:
+            response["timings"] = timings
+        return JSONResponse(response)
 
+    except HTTPException:
+        raise
     except Exception as e:
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/metrics")
+async def metrics():
+    # Per-process: with several uvicorn/gunicorn workers each one reports its own stages
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+@app.get("/features.csv")
+async def export_features():
+    path = await run_in(io_pool, feature_store.export_csv, OUTPUT_CSV)
+    return FileResponse(path, media_type="text/csv", filename="features_output.csv")
+
+@app.post("/batch/", status_code=202)
+async def submit_batch(audio_files: List[UploadFile] = File(default=[]),
+                       archive: Optional[UploadFile] = File(default=None),
+                       transcripts: str = Form(default="{}")):
+    """Queue a set of recordings (or a zip archive) for batch scoring and return a job id.
+
+    `transcripts` optionally maps file names to text; missing transcripts are generated.
+    """
+    try:
+        transcript_map = json.loads(transcripts)
+    except json.JSONDecodeError as e:
+        raise HTTPException(status_code=400, detail=f"transcripts is not valid JSON: {e}")
+    if not isinstance(transcript_map, dict):
+        raise HTTPException(status_code=400, detail="transcripts must map file names to text")
+    for audio_file in audio_files:
+        if audio_file.filename and not audio_file.filename.lower().endswith(SUPPORTED_EXTENSIONS):
+            raise HTTPException(status_code=400, detail=f"Unsupported audio format: {audio_file.filename}")
+
+    await acquire_slot()
+    work_dir = job_manager.new_work_dir()
+    try:
+        samples = []
+        if archive is not None and archive.filename:
+            archive_path = os.path.join(work_dir, "upload.zip")
+            await save_upload(archive, archive_path)
+            try:
+                samples = await run_in(io_pool, extract_archive, archive_path, work_dir)
+            except (ValueError, zipfile.BadZipFile) as e:
+                raise HTTPException(status_code=400, detail=f"Invalid archive: {e}")
+        for audio_file in audio_files:
+            name = os.path.basename(audio_file.filename or "")
+            if not name:
+                continue
+            if any(name == sample[0] for sample in samples):
+                raise HTTPException(status_code=400, detail=f"Duplicate file name: {name}")
+            audio_path = os.path.join(work_dir, name)
+            await save_upload(audio_file, audio_path)
+            samples.append((name, audio_path, None))
+        if not samples:
+            raise HTTPException(status_code=400, detail="No audio files provided")
+
+        samples = [(name, path, transcript_map.get(name) or text) for name, path, text in samples]
+        return {"job_id": job_manager.submit(samples, work_dir), "total": len(samples)}
+    except BaseException:
+        shutil.rmtree(work_dir, ignore_errors=True)
+        raise
+    finally:
+        admission.release()
+
+@app.get("/jobs/{job_id}")
+async def job_status(job_id: str):
+    snapshot = await run_in(io_pool, job_manager.snapshot, job_id)
+    if snapshot is None:
+        raise HTTPException(status_code=404, detail="Unknown job id")
+    return snapshot
+
+@app.get("/jobs/{job_id}/stream")
+def job_stream(job_id: str):
+    if job_manager.get(job_id) is None:
+        raise HTTPException(status_code=404, detail="Unknown job id")
+    # A sync generator is iterated on Starlette's threadpool, so waiting never blocks the loop
+    events = (json.dumps(event) + "\n" for event in job_manager.stream(job_id))
+    return StreamingResponse(events, media_type="application/x-ndjson")
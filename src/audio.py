@@ -0,0 +1,158 @@
+# src/audio.py
+
+import io
+import os
+import subprocess
+import threading
+
+import numpy as np
+import soundfile as sf
+
+from src.instrumentation import timed
+from src.speech_activity import analyze_speech_activity
+
+# Everything is normalized to 16 kHz mono, the rate Whisper expects, so decoding
+# once serves both the transcriber and the audio features.
+TARGET_SR = 16000
+MIN_DURATION = 0.1  # Less than 100ms is likely an error
+
+# libsndfile decodes WAV, FLAC, OGG/Opus and MP3 in-process; other codecs go through ffmpeg
+SUPPORTED_EXTENSIONS = (".wav", ".flac", ".ogg", ".opus", ".mp3", ".aiff", ".m4a", ".aac", ".webm", ".mp4")
+DECODE_BLOCK_FRAMES = 1 << 16
+# At most this many ffmpeg decoders run at once; further decodes wait for a slot
+FFMPEG_SLOTS = int(os.environ.get("VCD_FFMPEG_SLOTS", os.cpu_count() or 2))
+_ffmpeg_slots = threading.BoundedSemaphore(FFMPEG_SLOTS)
+
+
+class AudioContext:
+    """A recording decoded once and shared by every audio feature."""
+
+    def __init__(self, y, sr, path=None):
+        self.y = y
+        self.sr = sr
+        self.path = path
+        self.duration = len(y) / sr if sr else 0.0
+        self._activity = {}
+
+    def activity(self, top_db=30):
+        """Speech/silence intervals, computed once per threshold and shared by all features."""
+        if top_db not in self._activity:
+            self._activity[top_db] = analyze_speech_activity(self.y, self.sr, top_db=top_db)
+        return self._activity[top_db]
+
+    def speech_intervals(self, top_db=30):
+        return self.activity(top_db).speech
+
+    def __repr__(self):
+        return f"AudioContext(path={self.path!r}, sr={self.sr}, duration={self.duration:.2f}s)"
+
+
+def is_buffer(source):
+    """True for in-memory audio (bytes, bytearray, memoryview) or an open binary file object."""
+    return isinstance(source, (bytes, bytearray, memoryview, io.IOBase))
+
+
+def as_file(source):
+    if isinstance(source, io.IOBase):
+        source.seek(0)
+        return source
+    return io.BytesIO(source)  # shares a bytes object's buffer rather than copying it
+
+
+def buffer_bytes(source):
+    """Bytes of an in-memory source, for handing it to another process."""
+    if isinstance(source, io.BytesIO):
+        return source.getvalue()
+    if isinstance(source, io.IOBase):
+        source.seek(0)
+        return source.read()
+    return source if isinstance(source, bytes) else bytes(source)
+
+
+def hash_source(digest, source, chunk_size=1 << 20):
+    """Feed the bytes of a file path or in-memory source into a hashlib digest.
+
+    A path and a buffer with the same contents hash alike, so caches keyed on an
+    upload still hit once it has been archived to disk.
+    """
+    if isinstance(source, AudioContext):
+        # Keyed on the file it was decoded from, or on the samples for in-memory audio
+        if source.path:
+            return hash_source(digest, source.path, chunk_size)
+        digest.update(np.ascontiguousarray(source.y).data)
+        return digest
+    if isinstance(source, io.BytesIO):
+        digest.update(source.getbuffer())
+    elif isinstance(source, (bytes, bytearray, memoryview)):
+        digest.update(source)
+    else:
+        f = as_file(source) if is_buffer(source) else open(source, "rb")
+        try:
+            for chunk in iter(lambda: f.read(chunk_size), b""):
+                digest.update(chunk)
+        finally:
+            if f is not source:
+                f.close()
+    return digest
+
+
+def decode_soundfile(source, sr=TARGET_SR):
+    """Decode with libsndfile block by block, downmixing and resampling each block as it is read.
+
+    Only the resampled signal is held in memory, never the full native-rate decode.
+    """
+    with sf.SoundFile(as_file(source) if is_buffer(source) else source) as f:
+        if sr is None or sr == f.samplerate:
+            return f.read(dtype="float32", always_2d=True).mean(axis=1), f.samplerate
+        import soxr
+        stream = soxr.ResampleStream(f.samplerate, sr, 1, dtype="float32", quality="HQ")
+        chunks = [stream.resample_chunk(block.mean(axis=1))
+                  for block in f.blocks(DECODE_BLOCK_FRAMES, dtype="float32", always_2d=True)]
+        chunks.append(stream.resample_chunk(np.zeros(0, dtype=np.float32), last=True))
+        return np.concatenate(chunks), sr
+
+
+def decode_ffmpeg(source, sr=TARGET_SR):
+    """Decode any codec ffmpeg knows straight to mono float32 PCM through a pipe (no WAV on disk)."""
+    sr = sr or TARGET_SR
+    cmd = ["ffmpeg", "-hide_banner", "-loglevel", "error", "-i", "pipe:0" if is_buffer(source) else source,
+           "-f", "f32le", "-ac", "1", "-ar", str(sr), "pipe:1"]
+    with _ffmpeg_slots:
+        try:
+            result = subprocess.run(cmd, input=buffer_bytes(source) if is_buffer(source) else None,
+                                    capture_output=True)
+        except FileNotFoundError:
+            raise RuntimeError("Unsupported audio format: libsndfile cannot decode it and ffmpeg is not installed.")
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg could not decode the audio: {result.stderr.decode(errors='replace').strip()}")
+    return np.frombuffer(result.stdout, dtype=np.float32).copy(), sr
+
+
+def decode(source, sr=TARGET_SR):
+    """Mono float32 at sr from a path or in-memory audio; in-process where libsndfile can, else ffmpeg."""
+    if not is_buffer(source) and not os.path.exists(source):
+        raise FileNotFoundError(source)
+    try:
+        return decode_soundfile(source, sr)
+    except sf.SoundFileError:
+        return decode_ffmpeg(source, sr)
+
+
+@timed("decode")
+def load_audio(source, sr=TARGET_SR):
+    """Decode a file path or an in-memory upload (see is_buffer), in any supported format."""
+    y, sr = decode(source, sr)
+    return AudioContext(y, sr, path=None if is_buffer(source) else source)
+
+
+def as_audio_context(audio, sr=TARGET_SR):
+    if isinstance(audio, AudioContext):
+        return audio
+    return load_audio(audio, sr=sr)
+
+
+def check_duration(audio, min_duration=MIN_DURATION):
+    audio = as_audio_context(audio)
+    if audio.duration < min_duration:
+        raise ValueError("Audio file appears to be empty or corrupted. Please check the file and try again.")
+    return audio.duration
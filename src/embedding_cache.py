@@ -0,0 +1,66 @@
+# src/embedding_cache.py
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+
+def content_key(sentence, model_name=""):
+    return hashlib.sha1(f"{model_name}\0{sentence}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """Content-hashed LRU cache of sentence embeddings, optionally persisted as .npz."""
+
+    def __init__(self, max_entries=100_000, model_name=""):
+        self.max_entries = max_entries
+        self.model_name = model_name
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, sentence):
+        key = content_key(sentence, self.model_name)
+        with self._lock:
+            vec = self._entries.get(key)
+            if vec is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return vec
+
+    def put(self, sentence, vec):
+        key = content_key(sentence, self.model_name)
+        with self._lock:
+            self._entries[key] = np.asarray(vec, dtype=np.float32)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def save(self, path):
+        with self._lock:
+            keys = np.array(list(self._entries.keys()))
+            vecs = np.stack(list(self._entries.values())) if self._entries else np.empty((0, 0), np.float32)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = path + ".tmp.npz"
+        np.savez(tmp_path, keys=keys, vecs=vecs)
+        os.replace(tmp_path, path)
+
+    def load(self, path):
+        if not os.path.exists(path):
+            return 0
+        data = np.load(path)
+        with self._lock:
+            for key, vec in zip(data["keys"], data["vecs"]):
+                self._entries[str(key)] = vec
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return len(data["keys"])
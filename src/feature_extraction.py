@@ -1,35 +1,85 @@
 # src/feature_extraction.py
 
-import librosa
 import numpy as np
 import os
-import re
-from nltk.tokenize import sent_tokenize, word_tokenize
-from sklearn.metrics.pairwise import cosine_similarity
-from sentence_transformers import SentenceTransformer
+from src.audio import as_audio_context
+from src.embedding_cache import EmbeddingCache
+from src.inference_backends import SENTENCE_BACKEND, load_sentence_encoder, model_tag
+from src.instrumentation import span, timed
+from src.model_registry import registry
+from src.transcript import as_parsed_transcript, parse_transcripts
 
-model = SentenceTransformer("paraphrase-MiniLM-L6-v2")
+SENTENCE_MODEL_NAME = "paraphrase-MiniLM-L6-v2"
+embedding_cache = EmbeddingCache(model_name=model_tag(SENTENCE_MODEL_NAME, SENTENCE_BACKEND))
 
-def count_pauses(audio_path, threshold_db=-30):
-    y, sr = librosa.load(audio_path)
-    intervals = librosa.effects.split(y, top_db=abs(threshold_db))
-    total_speech = sum([(end - start) for start, end in intervals])
-    pause_count = len(y) - total_speech
-    pause_durations = [(end - start)/sr for start, end in intervals]
-    return len(pause_durations), np.mean(pause_durations)
+def _load_sentence_model():
+    # torch, int8 or onnx, per VCD_SENTENCE_BACKEND
+    return load_sentence_encoder(SENTENCE_MODEL_NAME, SENTENCE_BACKEND)
 
+registry.register("sentence_encoder", _load_sentence_model)
+
+def get_sentence_model():
+    return registry.get("sentence_encoder")
+
+@timed("count_pauses")
+def count_pauses(audio, threshold_db=-30):
+    """Number and mean duration (s) of the silent pauses between speech intervals."""
+    activity = as_audio_context(audio).activity(abs(threshold_db))
+    return activity.pause_count, activity.pause_mean
+
+@timed("speech_rate")
+def speech_rate(text, audio):
+    duration = as_audio_context(audio).duration
+    if duration == 0:
+        raise ValueError("Audio file has zero duration.")
+    return as_parsed_transcript(text).word_count / (duration / 60)
+
+@timed("text_features")
 def extract_text_features(text):
-    sents = sent_tokenize(text)
-    words = word_tokenize(text)
-    hesitation_count = len(re.findall(r'\b(uh+|um+)\b', text.lower()))
-    lexical_diversity = len(set(words)) / len(words) if words else 0
-    incomplete_sentences = sum(1 for sent in sents if not sent.endswith(('.', '?')))
-    return hesitation_count, lexical_diversity, incomplete_sentences
+    """Hesitation count, lexical diversity and incomplete sentences of a transcript or ParsedTranscript."""
+    return as_parsed_transcript(text).text_features()
+
+@timed("text_features")
+def extract_text_features_batch(texts):
+    return [parsed.text_features() for parsed in parse_transcripts(texts)]
 
 def semantic_coherence(text):
-    sentences = sent_tokenize(text)
-    embeddings = model.encode(sentences)
-    similarities = []
-    for i in range(1, len(embeddings)):
-        similarities.append(cosine_similarity([embeddings[i]], [embeddings[i-1]])[0][0])
-    return np.mean(similarities) if similarities else 0
+    return semantic_coherence_batch([text])[0]
+
+@timed("sentence_encode")
+def encode_sentences(sentences, batch_size=64, cache=embedding_cache):
+    """Encode sentences in one batch, skipping the encoder for cached ones."""
+    if not sentences:
+        return np.empty((0, get_sentence_model().get_sentence_embedding_dimension()), dtype=np.float32)
+    vectors = [cache.get(s) if cache is not None else None for s in sentences]
+    missing = sorted({s for s, v in zip(sentences, vectors) if v is None})
+    if missing:
+        encoded = get_sentence_model().encode(missing, batch_size=batch_size, convert_to_numpy=True)
+        fresh = dict(zip(missing, encoded))
+        if cache is not None:
+            for sent, vec in fresh.items():
+                cache.put(sent, vec)
+        vectors = [fresh[s] if v is None else v for s, v in zip(sentences, vectors)]
+    return np.vstack(vectors).astype(np.float32, copy=False)
+
+def adjacent_similarities(embeddings):
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    unit = embeddings / np.maximum(norms, 1e-12)
+    return np.einsum("ij,ij->i", unit[1:], unit[:-1])
+
+@timed("semantic_coherence")
+def semantic_coherence_batch(texts, batch_size=64, cache=embedding_cache):
+    """Score many transcripts with a single encoder batch over all their sentences."""
+    with span("sentence_tokenize"):
+        per_text = [as_parsed_transcript(text).sentences for text in texts]
+    offsets = np.cumsum([0] + [len(sents) for sents in per_text])
+    embeddings = encode_sentences([s for sents in per_text for s in sents], batch_size, cache)
+    if len(embeddings) < 2:
+        return [0] * len(texts)
+    sims = adjacent_similarities(embeddings)
+    scores = []
+    for start, end in zip(offsets[:-1], offsets[1:]):
+        # Pair i compares sentence i+1 with sentence i, so drop pairs crossing transcripts
+        pair_sims = sims[start:end - 1] if end - start >= 2 else ()
+        scores.append(float(np.mean(pair_sims)) if len(pair_sims) else 0)
+    return scores
@@ -0,0 +1,134 @@
+# src/feature_store.py
+
+import fcntl
+import glob
+import hashlib
+import os
+import time
+import uuid
+from contextlib import contextmanager
+
+import pandas as pd
+
+from src.audio import hash_source
+from src.instrumentation import timed
+
+try:
+    import pyarrow  # noqa: F401
+    PART_FORMAT = "parquet"
+except ImportError:  # Fall back to CSV parts when pyarrow is not installed
+    PART_FORMAT = "csv"
+
+STORE_DIR = os.environ.get("VCD_FEATURE_STORE", os.path.join("data", "processed", "feature_store"))
+# Part of every content hash; bump when a feature's definition changes so stored
+# rows computed the old way are treated as stale and recomputed
+FEATURE_VERSION = "2"
+KEY_COLUMNS = ["sample_id", "content_hash", "updated_at"]
+
+
+def content_hash(audio, transcript=""):
+    """Hash of the recording bytes (a path or an in-memory buffer) and its transcript."""
+    digest = hash_source(hashlib.sha1(), audio)
+    digest.update(transcript.encode("utf-8"))
+    digest.update(FEATURE_VERSION.encode("utf-8"))
+    return digest.hexdigest()
+
+
+class FeatureStore:
+    """Append-only columnar feature store keyed by sample id and content hash.
+
+    Every write lands in its own immutable part file (written to a temp name and
+    renamed), so concurrent API workers can append without coordination. Reads
+    merge the parts and keep the latest row per sample_id, which gives upsert
+    semantics; compact() folds the parts back into one under a file lock.
+    """
+
+    def __init__(self, root=STORE_DIR, part_format=PART_FORMAT):
+        self.root = root
+        self.part_format = part_format
+        os.makedirs(root, exist_ok=True)
+
+    # --- Writes ---
+
+    @timed("feature_store_write")
+    def upsert(self, feature_df, content_hashes):
+        df = feature_df.copy()
+        df["content_hash"] = list(content_hashes)
+        df["updated_at"] = time.time()
+        return self._write_part(df)
+
+    def _write_part(self, df, name=None):
+        # Part names sort by creation time so later parts win on read
+        name = name or f"part-{time.time_ns():020d}-{uuid.uuid4().hex[:8]}.{self.part_format}"
+        path = os.path.join(self.root, name)
+        tmp_path = os.path.join(self.root, "." + name + ".tmp")
+        if self.part_format == "parquet":
+            df.to_parquet(tmp_path, index=False)
+        else:
+            df.to_csv(tmp_path, index=False)
+        os.replace(tmp_path, path)
+        return path
+
+    @contextmanager
+    def _lock(self, mode=fcntl.LOCK_EX):
+        with open(os.path.join(self.root, ".lock"), "a") as lock_file:
+            fcntl.flock(lock_file, mode)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def compact(self):
+        with self._lock():
+            parts = self._parts()
+            if len(parts) < 2:
+                return
+            # Keep the newest merged part's position in the ordering so that parts
+            # appended while compacting still win over the compacted rows
+            newest = os.path.basename(parts[-1]).rsplit(".", 1)[0]
+            self._write_part(self._merge(parts), f"{newest}-compact.{self.part_format}")
+            for path in parts:
+                os.remove(path)
+
+    # --- Reads ---
+
+    def _parts(self):
+        return sorted(glob.glob(os.path.join(self.root, "part-*.parquet")) +
+                      glob.glob(os.path.join(self.root, "part-*.csv")),
+                      key=os.path.basename)
+
+    def _read_part(self, path, columns=None):
+        # Older parts may predate a column, so project onto what each part actually has
+        if path.endswith(".parquet"):
+            if columns is not None:
+                import pyarrow.parquet as pq
+                available = set(pq.read_schema(path).names)
+                columns = [col for col in columns if col in available]
+            return pd.read_parquet(path, columns=columns)
+        return pd.read_csv(path, usecols=None if columns is None else lambda col: col in columns)
+
+    def _merge(self, parts, columns=None):
+        frames = [self._read_part(path, columns) for path in parts]
+        frames = [frame for frame in frames if not frame.empty]
+        if not frames:
+            return pd.DataFrame(columns=columns or KEY_COLUMNS)
+        merged = pd.concat(frames, ignore_index=True)
+        return merged.drop_duplicates(subset="sample_id", keep="last").reset_index(drop=True)
+
+    def read(self, columns=None):
+        """Latest row per sample, optionally reading only the given columns."""
+        projected = None
+        if columns is not None:
+            projected = list(dict.fromkeys(["sample_id"] + list(columns)))
+        with self._lock(fcntl.LOCK_SH):
+            return self._merge(self._parts(), projected)
+
+    def hashes(self):
+        df = self.read(columns=["content_hash"])
+        return dict(zip(df["sample_id"], df["content_hash"]))
+
+    @timed("csv_export")
+    def export_csv(self, path, columns=None):
+        df = self.read(columns)
+        df.drop(columns=["content_hash", "updated_at"], errors="ignore").to_csv(path, index=False)
+        return path
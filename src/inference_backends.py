@@ -0,0 +1,131 @@
+# src/inference_backends.py
+#
+# CPU inference backends for the two models, chosen per model:
+#   VCD_SENTENCE_BACKEND = torch | int8 | onnx
+#   VCD_WHISPER_BACKEND  = torch | int8
+# "int8" applies PyTorch dynamic quantization to the Linear layers; "onnx" runs the
+# sentence encoder's transformer as an exported ONNX Runtime graph. Whisper's
+# autoregressive decoder has no maintained ONNX export in openai-whisper, so it
+# offers int8 only. benchmarks/backend_parity.py reports the drift each backend causes.
+
+import json
+import os
+
+import numpy as np
+
+BACKENDS = ("torch", "int8", "onnx")
+SENTENCE_BACKEND = os.environ.get("VCD_SENTENCE_BACKEND", "torch")
+WHISPER_BACKEND = os.environ.get("VCD_WHISPER_BACKEND", "torch")
+ONNX_DIR = os.environ.get("VCD_ONNX_DIR", os.path.join("models", "onnx"))
+ONNX_THREADS = int(os.environ.get("VCD_ONNX_THREADS", 0))  # 0 = onnxruntime default
+
+
+def _check_backend(backend, allowed=BACKENDS):
+    if backend not in allowed:
+        raise ValueError(f"Unknown inference backend {backend!r}, expected one of {', '.join(allowed)}")
+
+
+def quantize_linear(model):
+    """Dynamic int8 quantization of every Linear layer (weights int8, activations quantized on the fly)."""
+    import torch
+    # Subclasses of nn.Linear (whisper.model.Linear only adds a dtype cast) are not
+    # picked up by quantize_dynamic; in float32 they behave exactly like nn.Linear.
+    for module in model.modules():
+        if isinstance(module, torch.nn.Linear) and type(module) is not torch.nn.Linear:
+            module.__class__ = torch.nn.Linear
+    return torch.quantization.quantize_dynamic(model.eval(), {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+
+
+# --- Sentence encoder ---
+
+class OnnxSentenceEncoder:
+    """SentenceTransformer-compatible encode() over an exported transformer and mean pooling.
+
+    Only the tokenizer and the ONNX session are held; torch is not needed at inference time.
+    """
+
+    def __init__(self, export_dir, threads=ONNX_THREADS):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        with open(os.path.join(export_dir, "encoder.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        self.max_seq_length = meta["max_seq_length"]
+        self.dimension = meta["dimension"]
+        self.tokenizer = AutoTokenizer.from_pretrained(export_dir)
+        self.model_path = os.path.join(export_dir, "model.onnx")
+        options = ort.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(self.model_path, options,
+                                            providers=["CPUExecutionProvider"])
+
+    def get_sentence_embedding_dimension(self):
+        return self.dimension
+
+    def encode(self, sentences, batch_size=64, convert_to_numpy=True, **_):
+        # Length-sorted batches keep padding short, as SentenceTransformer does
+        order = np.argsort([-len(s) for s in sentences], kind="stable")
+        embeddings = np.empty((len(sentences), self.dimension), dtype=np.float32)
+        for start in range(0, len(sentences), batch_size):
+            idx = order[start:start + batch_size]
+            tokens = self.tokenizer([sentences[i] for i in idx], padding=True, truncation=True,
+                                    max_length=self.max_seq_length, return_tensors="np")
+            hidden = self.session.run(None, {"input_ids": tokens["input_ids"].astype(np.int64),
+                                             "attention_mask": tokens["attention_mask"].astype(np.int64)})[0]
+            mask = tokens["attention_mask"][..., None].astype(np.float32)
+            embeddings[idx] = (hidden * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+        return embeddings
+
+
+def export_sentence_encoder(model_name, export_dir):
+    """Export the encoder's transformer to ONNX once, alongside its tokenizer and pooling metadata."""
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    model = SentenceTransformer(model_name, device="cpu")
+    transformer = model[0].auto_model.eval()
+    os.makedirs(export_dir, exist_ok=True)
+    sample = model.tokenizer(["An example sentence."], return_tensors="pt")
+    tmp_path = os.path.join(export_dir, "model.onnx.tmp")
+    with torch.no_grad():
+        torch.onnx.export(
+            transformer, (sample["input_ids"], sample["attention_mask"]), tmp_path,
+            input_names=["input_ids", "attention_mask"], output_names=["last_hidden_state"],
+            dynamic_axes={"input_ids": {0: "batch", 1: "sequence"}, "attention_mask": {0: "batch", 1: "sequence"},
+                          "last_hidden_state": {0: "batch", 1: "sequence"}},
+            opset_version=14,
+        )
+    model.tokenizer.save_pretrained(export_dir)
+    with open(os.path.join(export_dir, "encoder.json"), "w", encoding="utf-8") as f:
+        json.dump({"model_name": model_name, "max_seq_length": model.max_seq_length,
+                   "dimension": model.get_sentence_embedding_dimension()}, f)
+    os.replace(tmp_path, os.path.join(export_dir, "model.onnx"))
+    return export_dir
+
+
+def load_sentence_encoder(model_name, backend=SENTENCE_BACKEND):
+    _check_backend(backend)
+    if backend == "onnx":
+        export_dir = os.path.join(ONNX_DIR, model_name)
+        if not os.path.exists(os.path.join(export_dir, "model.onnx")):
+            export_sentence_encoder(model_name, export_dir)
+        return OnnxSentenceEncoder(export_dir)
+    from sentence_transformers import SentenceTransformer
+    model = SentenceTransformer(model_name, device="cpu" if backend == "int8" else None)
+    return quantize_linear(model) if backend == "int8" else model
+
+
+# --- Whisper ---
+
+def load_whisper(model_name, backend=WHISPER_BACKEND):
+    _check_backend(backend, ("torch", "int8"))
+    import whisper
+    if backend == "int8":
+        return quantize_linear(whisper.load_model(model_name, device="cpu"))
+    return whisper.load_model(model_name)
+
+
+def model_tag(name, backend):
+    """Name used in cache keys, so results from different backends never mix."""
+    return name if backend == "torch" else f"{name}-{backend}"
@@ -0,0 +1,280 @@
+# src/inference_service.py
+#
+# Optional local inference process that owns Whisper and the sentence encoder.
+# Web workers connect over a Unix socket and the service gathers concurrent
+# requests into micro-batches, so N workers share one copy of each model.
+#
+#   python -m src.inference_service --socket /tmp/vcd-inference.sock
+#
+# Workers use it when VCD_INFERENCE_SOCKET points at the socket; otherwise the
+# helpers at the bottom of this module run the models in-process as before.
+
+import argparse
+import itertools
+import os
+import queue
+import secrets
+import threading
+import time
+from concurrent.futures import Future
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Listener
+
+from src.instrumentation import span
+
+SOCKET_ENV = "VCD_INFERENCE_SOCKET"
+AUTHKEY_ENV = "VCD_INFERENCE_AUTHKEY"
+DEFAULT_SOCKET = "/tmp/vcd-inference.sock"
+
+
+def key_path(address):
+    return address + ".key"
+
+
+def _authkey(address):
+    """Shared secret for the socket: VCD_INFERENCE_AUTHKEY, or the key file the service wrote.
+
+    Connections unpickle what the peer sends, so only processes that can read the key
+    (same user, 0600) may talk to the service.
+    """
+    key = os.environ.get(AUTHKEY_ENV)
+    if key:
+        return key.encode("utf-8")
+    try:
+        with open(key_path(address), "rb") as f:
+            return f.read().strip()
+    except FileNotFoundError:
+        raise RuntimeError(f"No authkey for {address}: set {AUTHKEY_ENV} or start the inference service first") from None
+
+
+def _create_authkey(address):
+    # Generated per service start unless VCD_INFERENCE_AUTHKEY is set; readable by its owner only
+    if os.environ.get(AUTHKEY_ENV):
+        return _authkey(address)
+    path = key_path(address)
+    if os.path.exists(path):
+        os.remove(path)
+    key = secrets.token_hex(32).encode("utf-8")
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, "wb") as f:
+        f.write(key)
+    return key
+
+
+def _run_transcribe(payloads):
+    from src.preprocessing import transcribe_batch
+    return transcribe_batch(payloads)
+
+
+def _run_semantic_coherence(payloads):
+    from src.feature_extraction import semantic_coherence_batch
+    return semantic_coherence_batch(payloads)
+
+
+# op name -> (batch function, model to warm up)
+OPERATIONS = {
+    "transcribe": (_run_transcribe, "whisper"),
+    "semantic_coherence": (_run_semantic_coherence, "sentence_encoder"),
+}
+
+
+class InferenceServer:
+    """Accepts requests over a Unix socket and runs them in per-operation micro-batches."""
+
+    def __init__(self, address=DEFAULT_SOCKET, max_batch=16, max_latency=0.01):
+        self.address = address
+        self.max_batch = max_batch
+        self.max_latency = max_latency
+        self.queues = {op: queue.Queue() for op in OPERATIONS}
+
+    def serve_forever(self):
+        import src.feature_extraction  # noqa: F401 - registers the model loaders
+        import src.preprocessing  # noqa: F401
+        from src.model_registry import registry
+        registry.warm_up([model for _, model in OPERATIONS.values()])
+
+        for op in OPERATIONS:
+            threading.Thread(target=self._batch_loop, args=(op,), name=f"batch-{op}", daemon=True).start()
+
+        if os.path.exists(self.address):
+            os.remove(self.address)
+        authkey = _create_authkey(self.address)
+        # Bind under a restrictive umask so the socket is never reachable by other users
+        umask = os.umask(0o177)
+        try:
+            listener = Listener(self.address, family="AF_UNIX", authkey=authkey)
+        finally:
+            os.umask(umask)
+        os.chmod(self.address, 0o600)
+        with listener:
+            print(f"Inference service listening on {self.address}")
+            while True:
+                try:
+                    conn = listener.accept()
+                except (AuthenticationError, OSError) as e:
+                    print(f"Rejected inference service connection: {e}")
+                    continue
+                threading.Thread(target=self._read_loop, args=(conn,), daemon=True).start()
+
+    def _read_loop(self, conn):
+        send_lock = threading.Lock()
+        try:
+            while True:
+                request_id, op, payload = conn.recv()
+                if op not in self.queues:
+                    with send_lock:
+                        conn.send((request_id, False, f"Unknown operation {op!r}"))
+                    continue
+                self.queues[op].put((conn, send_lock, request_id, payload))
+        except (EOFError, OSError):
+            conn.close()
+
+    def _next_batch(self, op):
+        # Block for the first request, then gather more until the batch is full
+        # or the latency window since that first request has passed
+        batch = [self.queues[op].get()]
+        deadline = time.monotonic() + self.max_latency
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.queues[op].get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _batch_loop(self, op):
+        run_batch, _ = OPERATIONS[op]
+        while True:
+            batch = self._next_batch(op)
+            try:
+                replies = [(True, result) for result in run_batch([item[3] for item in batch])]
+            except Exception as e:
+                replies = [(False, str(e))] * len(batch)
+            for (conn, send_lock, request_id, _), (ok, value) in zip(batch, replies):
+                try:
+                    with send_lock:
+                        conn.send((request_id, ok, value))
+                except OSError:
+                    pass  # Client went away
+
+
+class InferenceClient:
+    """Thread-safe client; concurrent calls share one connection and are matched by request id."""
+
+    def __init__(self, address):
+        self.conn = Client(address, family="AF_UNIX", authkey=_authkey(address))
+        self._ids = itertools.count()
+        self._pending = {}
+        self._send_lock = threading.Lock()
+        self.closed = False
+        threading.Thread(target=self._receive_loop, name="inference-client", daemon=True).start()
+
+    def _receive_loop(self):
+        try:
+            while True:
+                request_id, ok, value = self.conn.recv()
+                future = self._pending.pop(request_id, None)
+                if future is None:
+                    continue
+                if ok:
+                    future.set_result(value)
+                else:
+                    future.set_exception(RuntimeError(value))
+        except (EOFError, OSError) as e:
+            self.closed = True
+            for future in list(self._pending.values()):
+                future.set_exception(ConnectionError(f"Inference service connection lost: {e}"))
+            self._pending.clear()
+
+    def call(self, op, payload, timeout=None):
+        request_id = next(self._ids)
+        future = Future()
+        self._pending[request_id] = future
+        with span(f"inference_service.{op}"):
+            with self._send_lock:
+                self.conn.send((request_id, op, payload))
+            return future.result(timeout)
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """Client for the service named by VCD_INFERENCE_SOCKET, or None to run models in-process."""
+    global _client
+    address = os.environ.get(SOCKET_ENV)
+    if not address:
+        return None
+    with _client_lock:
+        if _client is None or _client.closed:
+            _client = InferenceClient(address)
+        return _client
+
+
+def transcribe_audio(audio):
+    """Transcribe a file path, in-memory audio or a decoded AudioContext.
+
+    Buffers are sent to the service as bytes; decoded audio is sent as its file
+    path when it has one, since the path is far smaller than the samples.
+    """
+    client = get_client()
+    if client is not None:
+        from src.audio import AudioContext, buffer_bytes, is_buffer
+        if isinstance(audio, AudioContext):
+            payload = os.path.abspath(audio.path) if audio.path else audio
+        else:
+            payload = buffer_bytes(audio) if is_buffer(audio) else os.path.abspath(audio)
+        return client.call("transcribe", payload)
+    from src.preprocessing import transcribe_audio as local_transcribe
+    return local_transcribe(audio)
+
+
+def semantic_coherence(text):
+    client = get_client()
+    if client is not None:
+        return client.call("semantic_coherence", text)
+    from src.feature_extraction import semantic_coherence as local_semantic_coherence
+    return local_semantic_coherence(text)
+
+
+def transcribe_many(audios):
+    """Transcribe paths, buffers or already decoded AudioContexts; in-process, decoded audio is not decoded again."""
+    client = get_client()
+    if client is not None:
+        # Send concurrently so the service can gather them into micro-batches
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=min(16, len(audios) or 1)) as pool:
+            return list(pool.map(transcribe_audio, audios))
+    from src.preprocessing import transcribe_batch
+    return transcribe_batch(audios)
+
+
+def semantic_coherence_many(texts):
+    """Score strings or ParsedTranscripts; in-process, parsed transcripts are not tokenized again."""
+    client = get_client()
+    if client is not None:
+        from concurrent.futures import ThreadPoolExecutor
+        from src.transcript import ParsedTranscript
+        # The service parses for itself, so only the text is sent
+        texts = [text.text if isinstance(text, ParsedTranscript) else text for text in texts]
+        with ThreadPoolExecutor(max_workers=min(16, len(texts) or 1)) as pool:
+            return list(pool.map(semantic_coherence, texts))
+    from src.feature_extraction import semantic_coherence_batch
+    return semantic_coherence_batch(texts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the shared Whisper/MiniLM inference service.")
+    parser.add_argument("--socket", default=os.environ.get(SOCKET_ENV, DEFAULT_SOCKET))
+    parser.add_argument("--max-batch", type=int, default=16)
+    parser.add_argument("--max-latency-ms", type=float, default=10.0,
+                        help="How long to wait for more requests after the first one in a batch")
+    args = parser.parse_args()
+    InferenceServer(args.socket, args.max_batch, args.max_latency_ms / 1000).serve_forever()
+
+
+if __name__ == "__main__":
+    main()
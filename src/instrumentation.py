@@ -0,0 +1,139 @@
+# src/instrumentation.py
+#
+# Lightweight per-stage timing. Wrap a stage in `with span("name"):` or decorate
+# it with `@timed("name")`; durations feed Prometheus-style histograms (exported by
+# the apps' /metrics endpoints) and, inside `collect_timings()`, a per-request dict
+# that endpoints can return to the client. Set VCD_METRICS=0 to disable: spans then
+# return a shared no-op context manager and cost a single attribute check.
+
+import contextvars
+import functools
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+ENABLED = os.environ.get("VCD_METRICS", "1") != "0"
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, float("inf"))
+
+_NOOP = nullcontext()
+_request_timings = contextvars.ContextVar("request_timings", default=None)
+
+
+class Histogram:
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.sum += value
+        self.count += 1
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.durations = {}
+        self.errors = {}
+
+    def observe(self, stage, seconds, error=False):
+        with self._lock:
+            hist = self.durations.get(stage)
+            if hist is None:
+                hist = self.durations[stage] = Histogram()
+            hist.observe(seconds)
+            if error:
+                self.errors[stage] = self.errors.get(stage, 0) + 1
+
+    def render(self):
+        """Prometheus text exposition format."""
+        lines = [
+            "# HELP vcd_stage_duration_seconds Time spent in each processing stage.",
+            "# TYPE vcd_stage_duration_seconds histogram",
+        ]
+        with self._lock:
+            for stage, hist in sorted(self.durations.items()):
+                cumulative = 0
+                for bound, count in zip(hist.buckets, hist.counts):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f'vcd_stage_duration_seconds_bucket{{stage="{stage}",le="{le}"}} {cumulative}')
+                lines.append(f'vcd_stage_duration_seconds_sum{{stage="{stage}"}} {hist.sum}')
+                lines.append(f'vcd_stage_duration_seconds_count{{stage="{stage}"}} {hist.count}')
+            lines += [
+                "# HELP vcd_stage_errors_total Stage executions that raised an exception.",
+                "# TYPE vcd_stage_errors_total counter",
+            ]
+            for stage, count in sorted(self.errors.items()):
+                lines.append(f'vcd_stage_errors_total{{stage="{stage}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+
+@contextmanager
+def _span(name):
+    start = time.perf_counter()
+    error = False
+    try:
+        yield
+    except BaseException:
+        error = True
+        raise
+    finally:
+        record(name, time.perf_counter() - start, error)
+
+
+def span(name):
+    """Time the enclosed block as stage `name`."""
+    return _span(name) if ENABLED else _NOOP
+
+
+def timed(name):
+    """Decorator form of span()."""
+    def decorator(func):
+        if not ENABLED:
+            return func
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with _span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def record(name, seconds, error=False):
+    """Record a stage duration, e.g. one measured in a worker process."""
+    registry.observe(name, seconds, error)
+    timings = _request_timings.get()
+    if timings is not None:
+        timings[name] = timings.get(name, 0.0) + seconds
+
+
+@contextmanager
+def collect_timings():
+    """Collect per-stage seconds for the current request into the yielded dict."""
+    timings = {}
+    token = _request_timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _request_timings.reset(token)
+
+
+def in_context(func):
+    """Wrap func so it runs in a copy of the caller's context (for thread pool executors)."""
+    ctx = contextvars.copy_context()
+    return functools.partial(ctx.run, func)
+
+
+def render_metrics():
+    return registry.render()
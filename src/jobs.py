@@ -0,0 +1,336 @@
+# src/jobs.py
+
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from src.audio import SUPPORTED_EXTENSIONS, load_audio, check_duration
+from src.feature_extraction import count_pauses, extract_text_features, speech_rate
+from src.inference_service import transcribe_many, semantic_coherence_many
+from src.modeling import run_modeling, get_population_model
+from src.pitch import pitch_variability
+from src.transcript import parse_transcripts
+
+AUDIO_EXTENSIONS = SUPPORTED_EXTENSIONS
+CHUNK_SIZE = int(os.environ.get("VCD_BATCH_CHUNK_SIZE", 8))
+DECODE_WORKERS = int(os.environ.get("VCD_BATCH_DECODE_WORKERS", os.cpu_count() or 2))
+MAX_JOBS = int(os.environ.get("VCD_MAX_JOBS", 100))
+# Job state lives here rather than in memory, so every web worker can serve any job
+JOBS_DIR = os.environ.get("VCD_JOBS_DIR", os.path.join(tempfile.gettempdir(), "vcd-jobs"))
+STREAM_POLL_INTERVAL = 0.5
+MAX_ARCHIVE_MEMBERS = int(os.environ.get("VCD_ARCHIVE_MAX_MEMBERS", 1000))
+MAX_ARCHIVE_BYTES = int(os.environ.get("VCD_ARCHIVE_MAX_BYTES", 2 * 2**30))
+FINISHED = ("done", "failed")
+JOB_ID = re.compile(r"[0-9a-f]{32}")
+
+
+def to_native(record):
+    """Convert numpy values in a result record to JSON-serializable Python types."""
+    for key, value in record.items():
+        if isinstance(value, (np.integer, np.floating)):
+            value = float(value) if isinstance(value, np.floating) else int(value)
+        if isinstance(value, float) and np.isnan(value):
+            value = None
+        record[key] = value
+    return record
+
+
+def extract_archive(archive_path, dest_dir):
+    """Unpack the audio and matching .txt transcript members of a zip archive.
+
+    Returns a list of (sample_id, audio_path, transcript or None). Raises ValueError if
+    the archive has more than MAX_ARCHIVE_MEMBERS members, would unpack to more than
+    MAX_ARCHIVE_BYTES, or has two recordings or transcripts with the same name.
+    """
+    audio, transcripts = {}, {}
+    with zipfile.ZipFile(archive_path) as archive:
+        members = archive.infolist()
+        if len(members) > MAX_ARCHIVE_MEMBERS:
+            raise ValueError(f"Archive has {len(members)} members, the limit is {MAX_ARCHIVE_MEMBERS}")
+        # zipfile stops reading a member at its declared size, so the declared sizes bound the output
+        if sum(member.file_size for member in members) > MAX_ARCHIVE_BYTES:
+            raise ValueError(f"Archive unpacks to more than {MAX_ARCHIVE_BYTES} bytes")
+        for member in members:
+            name = os.path.basename(member.filename)
+            if member.is_dir() or not name or name.startswith("."):
+                continue
+            stem, ext = os.path.splitext(name)
+            if ext.lower() in AUDIO_EXTENSIONS:
+                if stem in audio:
+                    raise ValueError(f"Archive has more than one recording named {stem}: {name}")
+                path = os.path.join(dest_dir, name)
+                with archive.open(member) as src, open(path, "wb") as dst:
+                    shutil.copyfileobj(src, dst)
+                audio[stem] = (name, path)
+            elif ext.lower() == ".txt":
+                if stem in transcripts:
+                    raise ValueError(f"Archive has more than one transcript named {name}")
+                transcripts[stem] = archive.read(member).decode("utf-8", errors="replace")
+    return [(name, path, transcripts.get(stem)) for stem, (name, path) in sorted(audio.items())]
+
+
+class Job:
+    """A batch job whose status and results are kept in files under its own directory.
+
+    `status.json` is replaced atomically on every status change and each published
+    result or error is appended to `events.jsonl`, so any process can read the job.
+    The process running it also bumps `version` to wake its own streams at once.
+    """
+
+    def __init__(self, job_dir, samples=None, work_dir=None):
+        self.id = os.path.basename(job_dir)
+        self.dir = job_dir
+        self.samples = samples
+        self.work_dir = work_dir
+        self.total = len(samples) if samples is not None else 0
+        self.status = "queued"
+        self.created = time.time()
+        self.finished = None
+        self.version = 0
+        self.cond = threading.Condition()
+
+    @classmethod
+    def load(cls, job_dir):
+        """A read-only view of a job run by any process, or None if there is none."""
+        job = cls(job_dir)
+        state = job.read_state()
+        if state is None:
+            return None
+        job.total, job.status = state["total"], state["status"]
+        job.created, job.finished = state["created"], state["finished"]
+        return job
+
+    @property
+    def local(self):
+        return self.samples is not None
+
+    @property
+    def done(self):
+        return self.status in FINISHED
+
+    def read_state(self):
+        try:
+            with open(os.path.join(self.dir, "status.json")) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def read_events(self, offset=0):
+        """Events appended since byte `offset`, and the offset to continue from."""
+        try:
+            with open(os.path.join(self.dir, "events.jsonl"), "rb") as f:
+                f.seek(offset)
+                data = f.read()
+        except FileNotFoundError:
+            return [], offset
+        # A line the writer is still appending has no newline yet
+        complete = data[:data.rfind(b"\n") + 1]
+        return [json.loads(line) for line in complete.splitlines()], offset + len(complete)
+
+    def set_status(self, status):
+        with self.cond:
+            self.status = status
+            if self.done:
+                self.finished = time.time()
+            state = {"job_id": self.id, "status": status, "total": self.total,
+                     "created": self.created, "finished": self.finished}
+            tmp_path = os.path.join(self.dir, f"status.json.{os.getpid()}.tmp")
+            with open(tmp_path, "w") as f:
+                json.dump(state, f)
+            os.replace(tmp_path, os.path.join(self.dir, "status.json"))
+            self.version += 1
+            self.cond.notify_all()
+
+    def publish(self, results=(), errors=()):
+        events = [{"type": "result", "data": result} for result in results]
+        events += [{"type": "error", **error} for error in errors]
+        with self.cond:
+            with open(os.path.join(self.dir, "events.jsonl"), "a") as f:
+                f.write("".join(json.dumps(event) + "\n" for event in events))
+            self.version += 1
+            self.cond.notify_all()
+
+    def wait(self, version, timeout):
+        """Wait up to `timeout` seconds for anything newer than `version`."""
+        if not self.local:
+            time.sleep(min(timeout, STREAM_POLL_INTERVAL))
+            return
+        with self.cond:
+            self.cond.wait_for(lambda: self.version != version, timeout)
+
+    def snapshot(self):
+        state = self.read_state()
+        if state is None:
+            return None
+        events, _ = self.read_events()
+        results = [event["data"] for event in events if event["type"] == "result"]
+        errors = [{key: value for key, value in event.items() if key != "type"}
+                  for event in events if event["type"] == "error"]
+        return {
+            "job_id": self.id,
+            "status": state["status"],
+            "total": state["total"],
+            "completed": len(results) + len(errors),
+            "results": results,
+            "errors": errors,
+        }
+
+
+class JobManager:
+    """Runs batch scoring jobs in the background and lets clients poll or stream results.
+
+    A batch is processed in chunks: decoding is spread over a thread pool, missing
+    transcripts go through one batched Whisper call, and all sentences share one
+    encoder batch, so model calls are amortized across the recordings.
+
+    Progress is written under `jobs_dir`, so with several web workers a job can be
+    polled or streamed from any of them, not just the one that accepted it.
+    """
+
+    def __init__(self, workers=1, chunk_size=CHUNK_SIZE, max_jobs=MAX_JOBS, jobs_dir=JOBS_DIR):
+        self.chunk_size = chunk_size
+        self.max_jobs = max_jobs
+        self.jobs_dir = jobs_dir
+        self.jobs = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="batch-job")
+        self._decode_pool = ThreadPoolExecutor(max_workers=DECODE_WORKERS, thread_name_prefix="batch-decode")
+
+    def new_work_dir(self):
+        return tempfile.mkdtemp(prefix="vcd-batch-")
+
+    def submit(self, samples, work_dir):
+        """Queue a batch of (sample_id, audio_path, transcript or None); returns the job id."""
+        job = Job(os.path.join(self.jobs_dir, uuid.uuid4().hex), samples, work_dir)
+        with self._lock:
+            os.makedirs(self.jobs_dir, mode=0o700, exist_ok=True)
+            self._prune()
+            os.makedirs(job.dir, mode=0o700)
+            job.set_status("queued")
+            self.jobs[job.id] = job
+        self._executor.submit(self._run, job)
+        return job.id
+
+    def get(self, job_id):
+        """The job with this id, whichever worker process runs it, or None."""
+        job = self.jobs.get(job_id)
+        if job is None and JOB_ID.fullmatch(job_id):
+            job = Job.load(os.path.join(self.jobs_dir, job_id))
+        return job
+
+    def snapshot(self, job_id):
+        job = self.get(job_id)
+        return job.snapshot() if job is not None else None
+
+    def stream(self, job_id, poll_timeout=15):
+        """Yield per-sample results and errors as they finish, ending when the job does."""
+        job = self.get(job_id)
+        offset = 0
+        while True:
+            version = job.version
+            # Read the status first: once it is final, every event is already in the file
+            state = job.read_state()
+            if state is None:
+                return
+            events, offset = job.read_events(offset)
+            yield from events
+            if state["status"] in FINISHED:
+                yield {"type": "status", "status": state["status"]}
+                return
+            if not events:
+                job.wait(version, poll_timeout)
+
+    def _prune(self):
+        """Delete the oldest finished jobs, of any worker, to stay under max_jobs."""
+        names = os.listdir(self.jobs_dir)
+        finished = []
+        for name in names:
+            state = Job(os.path.join(self.jobs_dir, name)).read_state()
+            if state is not None and state["status"] in FINISHED:
+                finished.append((state["finished"], name))
+        finished.sort()
+        for _, name in finished[:max(len(names) - self.max_jobs + 1, 0)]:
+            shutil.rmtree(os.path.join(self.jobs_dir, name), ignore_errors=True)
+
+    # --- Processing ---
+
+    def _decode(self, sample):
+        sample_id, audio_path, transcript = sample
+        audio = load_audio(audio_path)
+        check_duration(audio)
+        pause_count, pause_avg = count_pauses(audio)
+        return {"sample_id": sample_id, "audio": audio, "audio_path": audio_path,
+                "transcript": transcript, "pause_count": pause_count, "pause_avg_duration": pause_avg,
+                "pitch_variability": pitch_variability(audio)}
+
+    def _run(self, job):
+        job.set_status("running")
+        try:
+            # Without a trained population model, clustering is only meaningful over
+            # the whole batch, so process it as one chunk
+            chunk_size = max(self.chunk_size if get_population_model() is not None else len(job.samples), 1)
+            for start in range(0, len(job.samples), chunk_size):
+                self._run_chunk(job, job.samples[start:start + chunk_size])
+            job.set_status("done")
+        except Exception as e:
+            job.publish(errors=[{"sample_id": None, "error": str(e)}])
+            job.set_status("failed")
+        finally:
+            shutil.rmtree(job.work_dir, ignore_errors=True)
+            # Finished jobs are served from their files like everyone else's
+            with self._lock:
+                self.jobs.pop(job.id, None)
+
+    def _run_chunk(self, job, samples):
+        decoded, errors = [], []
+        futures = [(sample[0], self._decode_pool.submit(self._decode, sample)) for sample in samples]
+        for sample_id, future in futures:
+            try:
+                decoded.append(future.result())
+            except Exception as e:
+                errors.append({"sample_id": sample_id, "error": str(e)})
+        if errors:
+            job.publish(errors=errors)
+        if not decoded:
+            return
+
+        missing = [item for item in decoded if not item["transcript"]]
+        if missing:
+            for item, text in zip(missing, transcribe_many([item["audio"] for item in missing])):
+                item["transcript"] = text
+
+        transcripts = [item["transcript"] for item in decoded]
+        parsed = parse_transcripts(transcripts)
+        rows = []
+        for item, text, semantic_sim in zip(decoded, parsed, semantic_coherence_many(parsed)):
+            hesitations, lexical_div, incomplete = extract_text_features(text)
+            rows.append({
+                "sample_id": item["sample_id"],
+                "pause_count": item["pause_count"],
+                "pause_avg_duration": item["pause_avg_duration"],
+                "speech_rate": speech_rate(text, item["audio"]),
+                "pitch_variability": item["pitch_variability"],
+                "hesitation_count": hesitations,
+                "lexical_diversity": lexical_div,
+                "incomplete_sentences": incomplete,
+                "semantic_similarity": semantic_sim
+            })
+
+        final_df = run_modeling(pd.DataFrame(rows))
+        results = [to_native(record) for record in final_df.to_dict(orient="records")]
+        for record, item in zip(results, decoded):
+            record["transcript"] = item["transcript"]
+        job.publish(results=results)
+
+
+job_manager = JobManager(workers=int(os.environ.get("VCD_BATCH_JOB_WORKERS", 1)))
@@ -0,0 +1,68 @@
+# src/model_registry.py
+
+import os
+import threading
+
+
+class ModelRegistry:
+    """Loads heavy models lazily on first use, exactly once per process.
+
+    Modules register a loader under a name at import time (which is cheap);
+    the model itself is only built the first time get() is called.
+    """
+
+    def __init__(self):
+        self._loaders = {}
+        self._models = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def register(self, name, loader):
+        with self._lock:
+            self._loaders[name] = loader
+            self._locks.setdefault(name, threading.Lock())
+
+    def get(self, name):
+        model = self._models.get(name)
+        if model is not None:
+            return model
+        if name not in self._loaders:
+            raise KeyError(f"No model registered under {name!r}")
+        with self._locks[name]:
+            # Another thread may have finished loading while we waited
+            if name not in self._models:
+                self._models[name] = self._loaders[name]()
+            return self._models[name]
+
+    def set(self, name, model):
+        """Replace a loaded model, e.g. with an alternative inference backend."""
+        with self._locks.setdefault(name, threading.Lock()):
+            self._models[name] = model
+
+    def is_loaded(self, name):
+        return name in self._models
+
+    def registered(self):
+        return list(self._loaders)
+
+    def warm_up(self, names=None):
+        """Load the given models (all registered ones by default) ahead of the first request."""
+        for name in names or self.registered():
+            self.get(name)
+
+
+registry = ModelRegistry()
+
+
+def preload_from_env(var="VCD_PRELOAD_MODELS"):
+    """Warm up the models listed in an env var ("all" or comma-separated names).
+
+    Called at app import time; with gunicorn's preload_app the master loads the
+    models before forking, so workers share their memory copy-on-write.
+    """
+    value = os.environ.get(var, "").strip()
+    if not value:
+        return []
+    names = None if value == "all" else [n.strip() for n in value.split(",") if n.strip()]
+    registry.warm_up(names)
+    return names or registry.registered()
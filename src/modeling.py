@@ -1,40 +1,208 @@
 # src/modeling.py
 
+import os
+import threading
+import time
+import joblib
+import numpy as np
 import pandas as pd
 from sklearn.cluster import KMeans
 from sklearn.ensemble import IsolationForest
+from sklearn.preprocessing import StandardScaler
+
+from src.instrumentation import timed
+
+FEATURE_COLUMNS = [
+    "pause_count", "pause_avg_duration", "speech_rate", "pitch_variability",
+    "hesitation_count", "lexical_diversity", "incomplete_sentences", "semantic_similarity",
+]
+# Risk weights as a vector over RISK_COLUMNS; inverted columns contribute (1 - x)
+RISK_COLUMNS = ["pause_avg_duration", "hesitation_count", "incomplete_sentences",
+                "semantic_similarity", "lexical_diversity"]
+RISK_WEIGHTS = np.array([0.3, 0.2, 0.2, 0.2, 0.1])
+RISK_INVERTED = np.array([False, False, False, True, True])  # lower similarity/diversity = more risk
+MODEL_PATH = os.environ.get("VCD_POPULATION_MODEL", os.path.join("models", "population.joblib"))
+N_CLUSTERS = 2
+# Fewer reference samples than this give degenerate clusters and no anomalies, so no
+# population model is fitted or refitted below it (scoring then falls back per call)
+MIN_SAMPLES = int(os.environ.get("VCD_POPULATION_MIN_SAMPLES", 20))
+# Serving refits the model once the stored reference set has grown by REFIT_GROWTH,
+# checking at most every REFIT_INTERVAL seconds (0 = never)
+REFIT_GROWTH = float(os.environ.get("VCD_POPULATION_REFIT_GROWTH", 0.2))
+REFIT_INTERVAL = float(os.environ.get("VCD_POPULATION_REFIT_INTERVAL", 300))
+
+
+class PopulationModel:
+    """Scaler, KMeans and IsolationForest fitted once on the reference corpus."""
+
+    def __init__(self, scaler, kmeans, iso, feature_columns, n_samples):
+        self.scaler = scaler
+        self.kmeans = kmeans
+        self.iso = iso
+        self.feature_columns = feature_columns
+        self.n_samples = n_samples
+
+    def transform(self, features):
+        if isinstance(features, pd.DataFrame):
+            features = features[self.feature_columns].to_numpy(dtype=float)
+        return self.scaler.transform(np.asarray(features, dtype=float))
+
+    def predict(self, features):
+        """Score a frame or a 2-D array in FEATURE_COLUMNS order.
+
+        Returns cluster ids, anomaly labels (1 = anomaly) and raw anomaly scores.
+        """
+        X = self.transform(features)
+        clusters = self.kmeans.predict(X)
+        # Score the forest once; IsolationForest.predict is this same threshold at 0
+        anomaly_scores = self.iso.decision_function(X)
+        anomalies = to_anomaly_labels(np.where(anomaly_scores < 0, -1, 1))
+        return clusters, anomalies, anomaly_scores
+
+
+def to_anomaly_labels(predictions):
+    # IsolationForest: 1 = not anomaly, -1 = anomaly
+    return (np.asarray(predictions) == -1).astype(int)
+
+
+@timed("fit_population_model")
+def fit_population_model(feature_df, n_clusters=N_CLUSTERS, contamination=0.1):
+    X = feature_df[FEATURE_COLUMNS].to_numpy(dtype=float)
+    scaler = StandardScaler().fit(X)
+    X = scaler.transform(X)
+    kmeans = KMeans(n_clusters=n_clusters, random_state=42, n_init=10).fit(X)
+    iso = IsolationForest(contamination=contamination, random_state=42).fit(X)
+    return PopulationModel(scaler, kmeans, iso, list(FEATURE_COLUMNS), len(feature_df))
+
+
+def save_population_model(model, path=MODEL_PATH):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp"
+    joblib.dump(model, tmp_path)
+    os.replace(tmp_path, path)
+    _set_cached_model(model, path)
+
+
+# --- Lazy loading ---
+
+_model_lock = threading.Lock()
+_cached_models = {}  # path -> (mtime_ns, model)
+
+
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def _set_cached_model(model, path):
+    with _model_lock:
+        _cached_models[path] = (_mtime(path), model)
+
+
+def get_population_model(path=MODEL_PATH):
+    """The persisted population model, reloaded whenever the file changes; None if none has been trained.
+
+    Costs one stat per call, so long-running workers pick up a model that
+    run_pipeline.py or another worker has retrained.
+    """
+    mtime = _mtime(path)
+    cached = _cached_models.get(path)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    with _model_lock:
+        cached = _cached_models.get(path)
+        if cached is None or cached[0] != mtime:
+            cached = _cached_models[path] = (mtime, joblib.load(path) if mtime is not None else None)
+        return cached[1]
+
+
+# --- Background refits ---
+
+_refit_lock = threading.Lock()
+_last_refit_check = None
+
+
+def refit_in_background(load_reference, path=MODEL_PATH, growth=REFIT_GROWTH, interval=REFIT_INTERVAL):
+    """Refit and swap in a new model on a daemon thread once the reference set has grown.
+
+    load_reference() returns the reference frame and runs on that thread. Checks run
+    at most once per interval seconds and never overlap; returns the thread, or None
+    when no check was started.
+    """
+    global _last_refit_check
+    if interval <= 0 or not _refit_lock.acquire(blocking=False):
+        return None
+    now = time.monotonic()
+    if _last_refit_check is not None and now - _last_refit_check < interval:
+        _refit_lock.release()
+        return None
+    _last_refit_check = now
+
+    def _refit():
+        try:
+            reference = load_reference().dropna(subset=FEATURE_COLUMNS)
+            current = get_population_model(path)
+            if len(reference) < MIN_SAMPLES:
+                return
+            if current is not None and len(reference) < current.n_samples * (1 + growth):
+                return
+            save_population_model(fit_population_model(reference), path)
+        finally:
+            _refit_lock.release()
+
+    thread = threading.Thread(target=_refit, name="population-refit", daemon=True)
+    thread.start()
+    return thread
+
+
+@timed("modeling")
+def run_modeling(feature_df: pd.DataFrame, model: PopulationModel = None) -> pd.DataFrame:
+    if model is None:
+        model = get_population_model()
+
+    if model is not None:
+        # Serve from the persisted reference models - no refit per call
+        clusters, anomalies, anomaly_scores = model.predict(feature_df)
+        feature_df["cluster"] = clusters
+        feature_df["anomaly"] = anomalies
+        feature_df["anomaly_score"] = anomaly_scores
+        feature_df["risk_score"] = compute_risk_scores(feature_df)
+        return feature_df
 
-def run_modeling(feature_df: pd.DataFrame) -> pd.DataFrame:
     features = feature_df.drop(columns=["sample_id"], errors='ignore')
 
-    if len(feature_df) < 2:
+    if len(feature_df) < N_CLUSTERS:
         # Handle single sample - no clustering or anomaly detection
         feature_df["cluster"] = 0  # default cluster
         feature_df["anomaly"] = 0  # not an anomaly
-        feature_df["risk_score"] = compute_risk_score(features.iloc[0])
+        feature_df["risk_score"] = compute_risk_scores(feature_df)
         return feature_df
 
     # --- Clustering ---
-    kmeans = KMeans(n_clusters=2, random_state=42)
+    kmeans = KMeans(n_clusters=N_CLUSTERS, random_state=42)
     feature_df["cluster"] = kmeans.fit_predict(features)
 
     # --- Anomaly Detection ---
     iso = IsolationForest(contamination=0.1, random_state=42)
-    feature_df["anomaly"] = iso.fit_predict(features)
-    feature_df["anomaly"] = feature_df["anomaly"].map({1: 0, -1: 1})  # 1 = not anomaly, -1 = anomaly
+    feature_df["anomaly"] = to_anomaly_labels(iso.fit_predict(features))
 
     # --- Risk Scoring ---
-    feature_df["risk_score"] = feature_df.apply(lambda row: compute_risk_score(row), axis=1)
+    feature_df["risk_score"] = compute_risk_scores(feature_df)
 
     return feature_df
 
+def compute_risk_scores(features, weights=RISK_WEIGHTS, inverted=RISK_INVERTED) -> np.ndarray:
+    """Score a whole frame, or a 2-D array with columns in RISK_COLUMNS order, in one shot."""
+    if isinstance(features, pd.DataFrame):
+        features = features[RISK_COLUMNS].to_numpy(dtype=float)
+    X = np.atleast_2d(np.asarray(features, dtype=float))
+    weights = np.asarray(weights, dtype=float)
+    # w * (1 - x) == w - w * x, so inverted columns become a constant offset and a negated weight
+    signed = np.where(inverted, -weights, weights)
+    offset = weights[inverted].sum()
+    return np.round(X @ signed + offset, 3)
+
 def compute_risk_score(row) -> float:
-    # You can fine-tune this function based on weights
-    score = (
-        0.3 * row["pause_avg_duration"] +
-        0.2 * row["hesitation_count"] +
-        0.2 * row["incomplete_sentences"] +
-        0.2 * (1 - row["semantic_similarity"]) +  # lower similarity = more risk
-        0.1 * (1 - row["lexical_diversity"])     # lower diversity = more risk
-    )
-    return round(score, 3)
+    return float(compute_risk_scores([[row[col] for col in RISK_COLUMNS]])[0])
@@ -0,0 +1,187 @@
+# src/pipeline.py
+
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+from src.audio import SUPPORTED_EXTENSIONS
+from src.feature_store import FEATURE_VERSION
+
+AUDIO_EXTENSIONS = SUPPORTED_EXTENSIONS
+
+
+def file_digest(path, chunk_size=1 << 20):
+    # Includes the feature version so checkpoints from older feature definitions are redone
+    digest = hashlib.sha1(FEATURE_VERSION.encode("utf-8"))
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class Manifest:
+    """Per-file checkpoint of pipeline results, keyed by input file name and content digest.
+
+    Stored as JSON lines, one appended per completed file, so checkpointing costs the
+    same however large the archive is. On load later lines win, a line cut short by
+    an interrupted run is ignored, and superseded lines are compacted away.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self.entries = {}
+        lines = 0
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for lines, line in enumerate(f, 1):
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    self.entries[entry.pop("name")] = entry
+        # Rewrite when lines were superseded or cut short, so appends start on a clean line
+        if lines > len(self.entries):
+            self._compact()
+
+    def lookup(self, name, digest):
+        entry = self.entries.get(name)
+        if entry and entry.get("digest") == digest:
+            return entry
+        return None
+
+    def record(self, name, digest, transcript, features):
+        entry = {"digest": digest, "transcript": transcript, "features": features}
+        with self._lock:
+            self.entries[name] = entry
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(self._line(name, entry))
+
+    @staticmethod
+    def _line(name, entry):
+        return json.dumps({"name": name, **entry}) + "\n"
+
+    def _compact(self):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.writelines(self._line(name, entry) for name, entry in self.entries.items())
+        os.replace(tmp_path, self.path)
+
+
+# --- Worker side: Whisper is loaded once per process by the initializer ---
+
+def _init_worker(torch_threads):
+    import torch
+    torch.set_num_threads(torch_threads)
+    # Load Whisper once for this worker; semantic scoring happens in the parent
+    import src.preprocessing  # noqa: F401
+    from src.model_registry import registry
+    registry.warm_up(["whisper"])
+
+
+def _audio_features(audio):
+    from src.feature_extraction import count_pauses
+    from src.pitch import pitch_variability
+
+    pause_count, pause_avg = count_pauses(audio)
+    return pause_count, pause_avg, pitch_variability(audio)
+
+
+def upload_audio_features(data, transcript):
+    """Audio features of an in-memory upload, from one decode, for the API's CPU pool.
+
+    Stage timings are returned alongside, since a worker's own metrics never reach /metrics.
+    """
+    from src.audio import load_audio
+    from src.feature_extraction import speech_rate
+    from src.instrumentation import collect_timings
+
+    with collect_timings() as timings:
+        audio = load_audio(data)
+        pause_count, pause_avg, pitch = _audio_features(audio)
+        features = pause_count, pause_avg, speech_rate(transcript, audio), pitch
+    return features, timings
+
+
+def process_file(raw_path, processed_dir, transcript_dir):
+    """Convert, transcribe and extract per-file features for one recording.
+
+    The recording is decoded once; pause detection and pitch tracking run on a helper thread
+    while Whisper transcribes the same samples, so CPU-bound audio work overlaps with inference.
+    """
+    from src.preprocessing import normalize_audio, transcribe_audio
+    from src.feature_extraction import extract_text_features, speech_rate
+    from src.transcript import ParsedTranscript
+
+    filename = os.path.basename(raw_path)
+    wav_name = os.path.splitext(filename)[0] + ".wav"
+    wav_path = os.path.join(processed_dir, wav_name)
+    audio = normalize_audio(raw_path, wav_path)
+
+    with ThreadPoolExecutor(max_workers=1) as audio_stage:
+        audio_future = audio_stage.submit(_audio_features, audio)
+        transcript = transcribe_audio(audio)
+        pause_count, pause_avg, pitch = audio_future.result()
+
+    with open(os.path.join(transcript_dir, os.path.splitext(filename)[0] + ".txt"), "w", encoding="utf-8") as f:
+        f.write(transcript)
+
+    parsed = ParsedTranscript(transcript)
+    hesitations, lexical_div, incomplete = extract_text_features(parsed)
+    features = {
+        "sample_id": wav_name,
+        "pause_count": int(pause_count),
+        "pause_avg_duration": float(pause_avg),
+        "speech_rate": float(speech_rate(parsed, audio)),
+        "pitch_variability": float(pitch),
+        "hesitation_count": int(hesitations),
+        "lexical_diversity": float(lexical_div),
+        "incomplete_sentences": int(incomplete),
+    }
+    return transcript, features
+
+
+# --- Driver side ---
+
+def run_parallel(raw_dir, processed_dir, transcript_dir, manifest_path, workers=2, torch_threads=1):
+    """Process every recording in raw_dir on a worker pool, skipping unchanged files.
+
+    Returns a list of (transcript, features) pairs in file name order. Each completed
+    file is appended to the manifest so an interrupted run resumes where it left off.
+    """
+    os.makedirs(processed_dir, exist_ok=True)
+    os.makedirs(transcript_dir, exist_ok=True)
+    manifest = Manifest(manifest_path)
+
+    names = sorted(f for f in os.listdir(raw_dir) if f.endswith(AUDIO_EXTENSIONS))
+    results = {}
+    pending = {}
+    for name in names:
+        digest = file_digest(os.path.join(raw_dir, name))
+        entry = manifest.lookup(name, digest)
+        if entry:
+            results[name] = (entry["transcript"], entry["features"])
+        else:
+            pending[name] = digest
+
+    print(f"{len(results)} file(s) unchanged, {len(pending)} to process with {workers} worker(s)")
+    if pending:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(torch_threads,)) as pool:
+            futures = {
+                pool.submit(process_file, os.path.join(raw_dir, name), processed_dir, transcript_dir): name
+                for name in pending
+            }
+            for future in as_completed(futures):
+                name = futures[future]
+                try:
+                    transcript, features = future.result()
+                except Exception as e:
+                    print(f"Failed to process {name}: {e}")
+                    continue
+                manifest.record(name, pending[name], transcript, features)
+                results[name] = (transcript, features)
+
+    return [results[name] for name in names if name in results]
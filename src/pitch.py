@@ -0,0 +1,99 @@
+# src/pitch.py
+
+import numpy as np
+import scipy.fft
+from numpy.lib.stride_tricks import sliding_window_view
+
+from src.audio import as_audio_context
+from src.instrumentation import timed
+
+FMIN = 65.0   # Hz, below typical adult speaking F0
+FMAX = 400.0  # Hz, above typical adult speaking F0
+FRAME_SECONDS = 0.04
+HOP_SECONDS = 0.01
+YIN_THRESHOLD = 0.15
+
+
+def yin_f0(y, sr, fmin=FMIN, fmax=FMAX, frame_length=None, hop_length=None, threshold=YIN_THRESHOLD):
+    """Vectorized YIN over a strided frame view; returns F0 in Hz per frame, NaN when unvoiced.
+
+    The difference function of every frame is computed at once through an FFT
+    autocorrelation, so the cost is O(n_frames * frame_length * log frame_length).
+    """
+    frame_length = frame_length or int(FRAME_SECONDS * sr)
+    hop_length = hop_length or int(HOP_SECONDS * sr)
+    tau_min = max(int(sr / fmax), 1)
+    tau_max = min(int(sr / fmin), frame_length - 1)
+    if len(y) < frame_length or tau_max <= tau_min:
+        return np.empty(0)
+
+    frames = sliding_window_view(np.asarray(y, dtype=np.float32), frame_length)[::hop_length]
+    frames = frames - frames.mean(axis=1, keepdims=True)
+    window = frame_length - tau_max  # samples compared at every lag
+
+    # d(tau) = E[0:w] + E[tau:tau+w] - 2 * r(tau), with r via FFT cross-correlation.
+    # Lags up to tau_max never wrap past frame_length, so n_fft >= frame_length suffices.
+    n_fft = 1 << int(np.ceil(np.log2(frame_length)))
+    spec = scipy.fft.rfft(frames, n_fft, axis=1, workers=-1)
+    head = scipy.fft.rfft(frames[:, :window], n_fft, axis=1, workers=-1)
+    acf = scipy.fft.irfft(spec * np.conj(head), n_fft, axis=1, workers=-1)[:, :tau_max + 1]
+    energy = np.cumsum(np.concatenate([np.zeros((len(frames), 1)), frames ** 2], axis=1), axis=1)
+    lag_energy = energy[:, window:window + tau_max + 1] - energy[:, :tau_max + 1]
+    diff = energy[:, [window]] + lag_energy - 2 * acf
+
+    # Cumulative mean normalized difference
+    cmnd = np.ones_like(diff)
+    taus = np.arange(1, tau_max + 1)
+    cmnd[:, 1:] = diff[:, 1:] * taus / np.maximum(np.cumsum(diff[:, 1:], axis=1), 1e-12)
+
+    # First lag below threshold in [tau_min, tau_max], else no pitch
+    search = cmnd[:, tau_min:tau_max]
+    below = search < threshold
+    voiced = below.any(axis=1)
+    first = np.argmax(below, axis=1)
+    # Move on to the local minimum that follows the threshold crossing: the first
+    # lag at or after the crossing where the curve starts rising again
+    cols = np.arange(search.shape[1] - 1)
+    rising = (np.diff(search, axis=1) > 0) & (cols >= first[:, None])
+    tau = np.where(rising.any(axis=1), np.argmax(rising, axis=1), search.shape[1] - 1) + tau_min
+    rows = np.arange(len(frames))
+
+    # Parabolic interpolation around the chosen lag
+    left = cmnd[rows, np.maximum(tau - 1, 0)]
+    mid = cmnd[rows, tau]
+    right = cmnd[rows, np.minimum(tau + 1, tau_max)]
+    denom = left - 2 * mid + right
+    shift = np.where(np.abs(denom) > 1e-12, 0.5 * (left - right) / np.where(denom == 0, 1, denom), 0.0)
+    f0 = sr / (tau + np.clip(shift, -1, 1))
+    return np.where(voiced, f0, np.nan)
+
+
+def pyin_f0(y, sr, fmin=FMIN, fmax=FMAX):
+    """Slower, more accurate F0 via librosa's probabilistic YIN."""
+    import librosa
+    f0, _, _ = librosa.pyin(y, fmin=fmin, fmax=fmax, sr=sr,
+                            frame_length=int(FRAME_SECONDS * sr * 2), hop_length=int(HOP_SECONDS * sr))
+    return f0
+
+
+@timed("pitch_variability")
+def pitch_variability(audio, intervals=None, accurate=False, top_db=30):
+    """Standard deviation of F0 in semitones over the voiced speech of a recording.
+
+    Only the speech intervals (in samples) are analysed; by default these are the
+    ones count_pauses already found on the same AudioContext. Returns 0 when fewer
+    than two voiced frames are found.
+    """
+    audio = as_audio_context(audio)
+    y, sr = audio.y, audio.sr
+    if intervals is None:
+        intervals = audio.speech_intervals(top_db)
+
+    estimate = pyin_f0 if accurate else yin_f0
+    f0 = [estimate(y[start:end], sr) for start, end in intervals]
+    f0 = np.concatenate(f0) if f0 else np.empty(0)
+    f0 = f0[np.isfinite(f0)]
+    if len(f0) < 2:
+        return 0.0
+    semitones = 12 * np.log2(f0 / np.median(f0))
+    return float(np.std(semitones))
@@ -1,37 +1,138 @@
 # src/preprocessing.py
 
 import os
-import torch
-import whisper
-import librosa
-import soundfile as sf
-from pydub import AudioSegment
+from src.audio import AudioContext, SUPPORTED_EXTENSIONS, TARGET_SR, load_audio
+from src.inference_backends import WHISPER_BACKEND, load_whisper, model_tag
+from src.instrumentation import timed
+from src.model_registry import registry
+from src.transcription_cache import transcription_cache, cache_key
 
-MODEL = whisper.load_model("base")
+WHISPER_MODEL_NAME = "base"
+# Transcribe only detected speech, packed into 30 s windows (see src/vad_transcription.py)
+WHISPER_VAD = os.environ.get("VCD_WHISPER_VAD", "0") != "0"
+
+# Cache keys name the backend too, so int8 transcripts never answer for float32 ones
+WHISPER_CACHE_NAME = f"whisper-{model_tag(WHISPER_MODEL_NAME, WHISPER_BACKEND)}"
+
+def _load_whisper():
+    # torch and whisper are imported on first use so that importing this module stays cheap
+    return load_whisper(WHISPER_MODEL_NAME, WHISPER_BACKEND)
+
+registry.register("whisper", _load_whisper)
+
+def get_whisper_model():
+    return registry.get("whisper")
+
+@timed("normalize_audio")
+def normalize_audio(source, output_path=None):
+    """Decode any supported format to 16 kHz mono in memory, optionally also keeping it as a WAV.
+
+    The returned AudioContext goes straight to feature extraction and transcription.
+    """
+    audio = load_audio(source)
+    if output_path is not None:
+        import soundfile as sf
+        sf.write(output_path, audio.y, audio.sr, subtype="PCM_16")
+    return audio
 
 def convert_to_wav(input_path, output_path):
-    audio = AudioSegment.from_file(input_path)
-    audio = audio.set_channels(1).set_frame_rate(16000)
-    audio.export(output_path, format="wav")
+    normalize_audio(input_path, output_path)
     return output_path
 
-def transcribe_audio(audio_path):
-    result = MODEL.transcribe(audio_path)
+def whisper_input(audio):
+    """The 16 kHz waveform Whisper expects, decoded in-process rather than by Whisper's ffmpeg call."""
+    if isinstance(audio, AudioContext):
+        return audio.y if audio.sr == TARGET_SR else load_audio(audio.path).y
+    return load_audio(audio).y
+
+@timed("transcribe")
+def transcribe_audio(audio, cache=transcription_cache, vad=None, **options):
+    """Transcribe a file path, in-memory audio (bytes, memoryview, BytesIO) or a decoded AudioContext.
+
+    With vad (default VCD_WHISPER_VAD) silence is skipped and speech is decoded in
+    30 s windows; see transcribe_segmented.
+    """
+    vad = WHISPER_VAD if vad is None else vad
+    key = None
+    if cache is not None:
+        key = cache_key(audio, WHISPER_CACHE_NAME, {**options, "vad": True} if vad else options)
+        cached = cache.get(key)
+        if cached is not None:
+            return cached['text']
+
+    if vad:
+        from src.vad_transcription import transcribe_segmented
+        if not isinstance(audio, AudioContext):
+            audio = load_audio(audio)
+        result = transcribe_segmented(audio, **options)
+    else:
+        result = get_whisper_model().transcribe(whisper_input(audio), **options)
+    if cache is not None:
+        cache.put(key, {
+            "text": result['text'],
+            "segments": [{"start": s["start"], "end": s["end"], "text": s["text"]} for s in result.get("segments", [])],
+        })
     return result['text']
 
+@timed("transcribe")
+def transcribe_array(y, **options):
+    """Transcribe an in-memory 16 kHz mono float32 waveform, e.g. a streamed speech segment."""
+    import numpy as np
+    result = get_whisper_model().transcribe(np.asarray(y, dtype=np.float32), **options)
+    return result['text'].strip()
+
+@timed("transcribe_batch")
+def transcribe_batch(audio_paths, cache=transcription_cache):
+    """Transcribe several recordings, decoding clips of up to 30 s together in one Whisper batch.
+
+    Entries may be paths, in-memory buffers or decoded AudioContexts, whose samples
+    are used as they are. Longer recordings fall back to transcribe_audio's sliding window.
+    """
+    import torch
+    import whisper
+
+    model_name = WHISPER_CACHE_NAME
+    texts = [None] * len(audio_paths)
+    keys = [None] * len(audio_paths)
+    short = []
+    for i, path in enumerate(audio_paths):
+        if cache is not None:
+            keys[i] = cache_key(path, model_name)
+            cached = cache.get(keys[i])
+            if cached is not None:
+                texts[i] = cached['text']
+                continue
+        audio = whisper_input(path)
+        if len(audio) <= whisper.audio.N_SAMPLES:
+            short.append((i, audio))
+        else:
+            texts[i] = transcribe_audio(path, cache=cache)
+
+    if short:
+        model = get_whisper_model()
+        mels = torch.stack([whisper.log_mel_spectrogram(whisper.pad_or_trim(audio)) for _, audio in short])
+        options = whisper.DecodingOptions(fp16=model.device.type == "cuda")
+        results = whisper.decode(model, mels.to(model.device), options)
+        for (i, _), result in zip(short, results):
+            texts[i] = result.text.strip()
+            if cache is not None:
+                cache.put(keys[i], {"text": texts[i], "segments": []})
+    return texts
+
 def preprocess_audio_dir(raw_dir, processed_dir, transcript_dir):
     os.makedirs(processed_dir, exist_ok=True)
     os.makedirs(transcript_dir, exist_ok=True)
 
     for filename in os.listdir(raw_dir):
-        if filename.endswith((".wav", ".mp3")):
+        if filename.lower().endswith(SUPPORTED_EXTENSIONS):
             input_path = os.path.join(raw_dir, filename)
-            output_path = os.path.join(processed_dir, filename.replace(".mp3", ".wav"))
+            stem = os.path.splitext(filename)[0]
+            output_path = os.path.join(processed_dir, stem + ".wav")
             
-            # Convert to WAV & preprocess
-            convert_to_wav(input_path, output_path)
+            # Decode & normalize once, keeping the WAV for later runs
+            audio = normalize_audio(input_path, output_path)
             
-            # Transcribe
-            text = transcribe_audio(output_path)
-            with open(os.path.join(transcript_dir, filename.replace(".wav", ".txt")), "w") as f:
+            # Transcribe the decoded samples
+            text = transcribe_audio(audio)
+            with open(os.path.join(transcript_dir, stem + ".txt"), "w") as f:
                 f.write(text)
@@ -0,0 +1,199 @@
+# src/streaming.py
+#
+# Block-wise analysis for long recordings: the WAV is read in fixed-size blocks,
+# speech intervals are detected incrementally with state carried across block
+# boundaries, and each finished speech segment can be handed to transcription
+# straight away. Peak memory is bounded by the block size and the longest
+# buffered segment, not by the recording length.
+#
+#   python -m src.streaming interview.wav [--transcribe]
+
+import argparse
+import json
+
+import numpy as np
+import soundfile as sf
+
+from src.audio import TARGET_SR
+from src.speech_activity import FRAME_LENGTH, HOP_LENGTH, SpeechActivity, power_db, speech_intervals, window_power
+
+BLOCK_SECONDS = 10.0
+MAX_SEGMENT_SECONDS = 30.0  # Whisper's window; longer speech runs are cut here
+
+
+def iter_blocks(audio_path, block_seconds=BLOCK_SECONDS):
+    """Yield (mono float32 block, sample rate) without loading the whole file."""
+    sr = sf.info(audio_path).samplerate
+    blocksize = int(block_seconds * sr)
+    for block in sf.blocks(audio_path, blocksize=blocksize, dtype="float32", always_2d=True):
+        yield block.mean(axis=1), sr
+
+
+class StreamingPauseDetector:
+    """Speech intervals over a stream of blocks, framed exactly as speech_activity.frame_power.
+
+    Frames are centered windows of frame_length samples every hop_length samples; the
+    samples a frame still needs are carried into the next block. While streaming, a
+    frame is speech when it is within top_db of the loudest frame up to and including
+    it, so every decision depends on the audio so far and not on the block size. Speech
+    segments are emitted from these running decisions. finish() re-thresholds the kept
+    frame powers (one float per hop) against the loudest frame of the whole stream, so
+    the final intervals are those analyze_speech_activity finds on the same samples.
+    """
+
+    def __init__(self, sr, top_db=30, frame_length=FRAME_LENGTH, hop_length=HOP_LENGTH,
+                 max_segment_seconds=MAX_SEGMENT_SECONDS, keep_audio=False):
+        self.sr = sr
+        self.top_db = top_db
+        self.frame_length = frame_length
+        self.hop_length = hop_length
+        self.max_segment = int(max_segment_seconds * sr)
+        self.keep_audio = keep_audio
+        self._pending = np.zeros(frame_length // 2)  # padded samples from the next frame's start on
+        self._n_frames = 0  # frames decided so far
+        self._n_samples = 0  # samples pushed so far
+        self._ref_power = 0.0  # loudest frame so far
+        self._powers = []
+        self._audio = np.empty(0, dtype=np.float32)  # kept samples, from _audio_offset on
+        self._audio_offset = 0
+        self._run_start = None  # absolute start of the open (possibly cut) speech segment
+        self._speech_start = None  # absolute start of the open speech run, ignoring cuts
+        self._done = False
+        self.intervals = []  # finished speech intervals in samples
+
+    def push(self, block):
+        """Consume a block; returns speech segments that finished inside it as
+        (start_seconds, end_seconds, audio or None)."""
+        self._n_samples += len(block)
+        if self.keep_audio:
+            self._audio = np.concatenate([self._audio, block.astype(np.float32, copy=False)])
+        return self._consume(np.concatenate([self._pending, block]))
+
+    def _consume(self, buf):
+        power = window_power(buf, self.frame_length, self.hop_length)
+        self._pending = buf[len(power) * self.hop_length:]
+        if not len(power):
+            return []
+        self._powers.append(power)
+        running = np.maximum.accumulate(np.concatenate([[self._ref_power], power]))[1:]
+        self._ref_power = float(running[-1])
+        speech = power_db(power) > power_db(running) - self.top_db
+        first_frame, self._n_frames = self._n_frames, self._n_frames + len(power)
+        finished = self._track_runs(speech, first_frame)
+        self._trim_audio()
+        return finished
+
+    def _track_runs(self, speech, first_frame):
+        # Run-length transitions within these frames, carrying the open run across blocks
+        finished = []
+        in_run = self._run_start is not None
+        edges = np.flatnonzero(np.diff(np.concatenate([[in_run], speech]).astype(np.int8)))
+        horizon = min(self._n_frames * self.hop_length, self._n_samples)
+        for pos in [min((first_frame + e) * self.hop_length, self._n_samples) for e in edges] + [None]:
+            end = horizon if pos is None else pos
+            # Cut speech runs longer than max_segment so segment buffers stay bounded
+            while self._run_start is not None and end - self._run_start > self.max_segment:
+                cut = self._run_start + self.max_segment
+                finished.append(self._close_run(cut, cut=True))
+                self._run_start = cut
+            if pos is None:
+                break
+            if self._run_start is None:
+                self._run_start = self._speech_start = pos
+            else:
+                finished.append(self._close_run(pos))
+        return finished
+
+    def _close_run(self, end, cut=False):
+        audio = None
+        if self.keep_audio:
+            audio = self._audio[self._run_start - self._audio_offset:end - self._audio_offset].copy()
+        if not cut:
+            self.intervals.append((self._speech_start, end))
+        segment = (self._run_start / self.sr, end / self.sr, audio)
+        self._run_start = None
+        return segment
+
+    def _trim_audio(self):
+        # Keep only what the open run or a run starting at the next undecided frame can need
+        if not self.keep_audio:
+            return
+        keep_from = self._run_start if self._run_start is not None else self._n_frames * self.hop_length
+        drop = min(keep_from, self._n_samples) - self._audio_offset
+        if drop > 0:
+            self._audio = self._audio[drop:]
+            self._audio_offset += drop
+
+    def finish(self):
+        """Decide the trailing frames, flush the open speech run and settle the final intervals."""
+        if self._done or not self._n_samples:
+            return []
+        finished = self._consume(np.concatenate([self._pending, np.zeros(self.frame_length // 2)]))
+        if self._run_start is not None:
+            finished.append(self._close_run(self._n_samples))
+        self._done = True
+        self.intervals = [tuple(i) for i in speech_intervals(
+            np.concatenate(self._powers), self._n_samples, self.top_db, self.hop_length).tolist()]
+        return finished
+
+    @property
+    def elapsed(self):
+        return self._n_samples / self.sr
+
+    def activity(self):
+        """Speech activity over the stream so far, in the same form count_pauses uses."""
+        decided = self._n_samples if self._done else min(self._n_frames * self.hop_length, self._n_samples)
+        return SpeechActivity(self.intervals, decided, self.sr)
+
+    def features(self):
+        activity = self.activity()
+        return activity.pause_count, activity.pause_mean
+
+
+def stream_analyze(audio_path, transcribe_segment=None, block_seconds=BLOCK_SECONDS, top_db=30):
+    """Analyze a recording block by block, yielding partial results as it progresses.
+
+    transcribe_segment, if given, is called as transcribe_segment(y_16k) for each
+    finished speech segment and its text is included in the partial result.
+    """
+    detector = None
+    for block, sr in iter_blocks(audio_path, block_seconds):
+        if detector is None:
+            detector = StreamingPauseDetector(sr, top_db=top_db, keep_audio=transcribe_segment is not None)
+        yield _partial(detector, detector.push(block), transcribe_segment, done=False)
+    if detector is not None:
+        yield _partial(detector, detector.finish(), transcribe_segment, done=True)
+
+
+def _partial(detector, segments, transcribe_segment, done):
+    pause_count, pause_avg = detector.features()
+    result = {"elapsed": detector.elapsed, "pause_count": pause_count,
+              "pause_avg_duration": pause_avg, "done": done, "segments": []}
+    for start, end, audio in segments:
+        segment = {"start": start, "end": end}
+        if transcribe_segment is not None:
+            if detector.sr != TARGET_SR:
+                import librosa
+                audio = librosa.resample(audio, orig_sr=detector.sr, target_sr=TARGET_SR)
+            segment["text"] = transcribe_segment(audio)
+        result["segments"].append(segment)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream pause features (and optionally transcripts) from a WAV file.")
+    parser.add_argument("audio_path")
+    parser.add_argument("--block-seconds", type=float, default=BLOCK_SECONDS)
+    parser.add_argument("--transcribe", action="store_true", help="Transcribe speech segments as they are found")
+    args = parser.parse_args()
+
+    transcribe_segment = None
+    if args.transcribe:
+        from src.preprocessing import transcribe_array
+        transcribe_segment = transcribe_array
+    for partial in stream_analyze(args.audio_path, transcribe_segment, args.block_seconds):
+        print(json.dumps(partial), flush=True)
+
+
+if __name__ == "__main__":
+    main()
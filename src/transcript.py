@@ -0,0 +1,96 @@
+# src/transcript.py
+
+import functools
+import re
+
+HESITATION_RE = re.compile(r'\b(uh+|um+)\b')
+SENTENCE_ENDINGS = ('.', '?')
+PARSE_CACHE_SIZE = 256
+
+
+@functools.lru_cache(maxsize=None)
+def sentence_tokenizer(language="english"):
+    """The Punkt model behind nltk's sent_tokenize, loaded once and shared by every parse."""
+    try:
+        from nltk.tokenize import PunktTokenizer  # nltk >= 3.9
+        return PunktTokenizer(language)
+    except ImportError:
+        import nltk.data
+        return nltk.data.load(f"tokenizers/punkt/{language}.pickle")
+
+
+@functools.lru_cache(maxsize=None)
+def word_tokenizer():
+    from nltk.tokenize import NLTKWordTokenizer
+    return NLTKWordTokenizer()
+
+
+class ParsedTranscript:
+    """A transcript tokenized once and shared by every text feature.
+
+    Sentences and tokens are computed on first access, so speech_rate alone never
+    pays for tokenization. Tokens equal nltk's word_tokenize(text), which runs the
+    same sentence split before the word tokenizer.
+    """
+
+    def __init__(self, text):
+        self.text = text
+
+    @functools.cached_property
+    def lower(self):
+        return self.text.lower()
+
+    @functools.cached_property
+    def sentences(self):
+        return sentence_tokenizer().tokenize(self.text)
+
+    @functools.cached_property
+    def tokens(self):
+        tokenize = word_tokenizer().tokenize
+        return [token for sent in self.sentences for token in tokenize(sent)]
+
+    @functools.cached_property
+    def word_count(self):
+        return len(self.text.split())
+
+    @property
+    def hesitation_count(self):
+        return len(HESITATION_RE.findall(self.lower))
+
+    @property
+    def lexical_diversity(self):
+        return len(set(self.tokens)) / len(self.tokens) if self.tokens else 0
+
+    @property
+    def incomplete_sentences(self):
+        return sum(1 for sent in self.sentences if not sent.endswith(SENTENCE_ENDINGS))
+
+    def text_features(self):
+        return self.hesitation_count, self.lexical_diversity, self.incomplete_sentences
+
+    def __repr__(self):
+        return f"ParsedTranscript({self.text[:40]!r}{'...' if len(self.text) > 40 else ''})"
+
+
+@functools.lru_cache(maxsize=PARSE_CACHE_SIZE)
+def parse_transcript(text):
+    """Parse a transcript, reusing the parse when the same text is seen again.
+
+    An endpoint computes text features, coherence and speech rate from the same
+    string, so they all share one tokenization.
+    """
+    return ParsedTranscript(text)
+
+
+def as_parsed_transcript(transcript):
+    if isinstance(transcript, ParsedTranscript):
+        return transcript
+    return parse_transcript(transcript)
+
+
+def parse_transcripts(texts):
+    """Parse a corpus, bypassing the per-text cache so a large batch does not evict it.
+
+    All parses share the module's tokenizer instances.
+    """
+    return [text if isinstance(text, ParsedTranscript) else ParsedTranscript(text) for text in texts]
@@ -0,0 +1,107 @@
+# src/transcription_cache.py
+
+import glob
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+
+from src.audio import hash_source
+
+CACHE_DIR = os.environ.get("VCD_TRANSCRIPT_CACHE", os.path.join("data", "cache", "transcripts"))
+MAX_BYTES = int(os.environ.get("VCD_TRANSCRIPT_CACHE_BYTES", 256 * 1024 * 1024))
+SWEEP_SECONDS = 600
+
+
+def cache_key(audio, model_name, options=None):
+    """Hash of the audio bytes (a path or an in-memory buffer) plus the model and decoding options."""
+    digest = hash_source(hashlib.sha256(), audio)
+    digest.update(model_name.encode("utf-8"))
+    digest.update(json.dumps(options or {}, sort_keys=True, default=str).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class TranscriptionCache:
+    """On-disk transcription cache with size-bounded, least-recently-used eviction.
+
+    One JSON file per entry; a hit refreshes the file's mtime so eviction removes
+    the entries that have gone unused the longest. Safe to share between processes.
+
+    The directory is only scanned when a put takes the running size over max_bytes,
+    and then trimmed to low_water * max_bytes so the next few puts do not scan again.
+    Other processes' writes are not counted, so the size is also resynced by a scan
+    at most every sweep_seconds.
+    """
+
+    def __init__(self, root=CACHE_DIR, max_bytes=MAX_BYTES, low_water=0.9, sweep_seconds=SWEEP_SECONDS):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.low_water = low_water
+        self.sweep_seconds = sweep_seconds
+        self._lock = threading.Lock()
+        self._size = None  # running total in bytes; None until the first scan
+        self._last_scan = 0.0
+
+    def _path(self, key):
+        return os.path.join(self.root, key[:2], key + ".json")
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, encoding="utf-8") as f:
+                result = json.load(f)
+            os.utime(path)
+            return result
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def put(self, key, result):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(result, f)
+        added = os.path.getsize(tmp_path)
+        try:
+            added -= os.path.getsize(path)  # overwriting an existing entry
+        except FileNotFoundError:
+            pass
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            if self._size is not None:
+                self._size += added
+            stale = time.monotonic() - self._last_scan > self.sweep_seconds
+            needs_scan = self._size is None or self._size > self.max_bytes or stale
+        if needs_scan:
+            self.evict()
+
+    def evict(self, target=None):
+        """Scan the cache, remove least recently used entries down to target bytes
+        (default low_water * max_bytes, once over max_bytes) and resync the running size."""
+        with self._lock:
+            entries = []
+            for path in glob.glob(os.path.join(self.root, "*", "*.json")):
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+            total = sum(size for _, size, _ in entries)
+            if target is None:
+                target = self.max_bytes * self.low_water if total > self.max_bytes else total
+            for _, size, path in sorted(entries):
+                if total <= target:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+            self._size = total
+            self._last_scan = time.monotonic()
+
+
+transcription_cache = TranscriptionCache()
@@ -0,0 +1,220 @@
+# src/vad_transcription.py
+#
+# Whisper over speech only. The speech intervals already found for the pause
+# features are padded, packed into windows of at most 30 s (Whisper's context) with
+# the silence between them dropped, decoded in batches or on a process pool, and the
+# window timestamps are mapped back onto the original recording.
+
+import atexit
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+import numpy as np
+
+from src.audio import TARGET_SR, as_audio_context
+from src.instrumentation import timed
+
+MAX_WINDOW_SECONDS = 30.0
+EDGE_PAD_SECONDS = 0.2  # kept around each interval so word onsets and tails are not clipped
+JOIN_GAP_SECONDS = 0.1  # silence inserted between intervals packed into one window
+
+WORKERS = int(os.environ.get("VCD_WHISPER_WORKERS", 0))  # 0 = batched decoding in-process
+TORCH_THREADS = int(os.environ.get("VCD_WHISPER_TORCH_THREADS", 1))  # per pool worker
+BATCH_SIZE = int(os.environ.get("VCD_WHISPER_BATCH_SIZE", 8))
+
+
+class Window:
+    """Speech from one or more intervals concatenated into a single Whisper input.
+
+    pieces holds (window_start, source_start, length) in samples for every interval
+    in the window, which maps window timestamps back to the recording.
+    """
+
+    def __init__(self, samples, pieces, sr):
+        self.samples = samples
+        self.pieces = pieces
+        self.sr = sr
+
+    @property
+    def start(self):
+        return self.pieces[0][1] / self.sr
+
+    @property
+    def end(self):
+        _, source_start, length = self.pieces[-1]
+        return (source_start + length) / self.sr
+
+    def to_source_time(self, t, end=False):
+        """Recording time of a window timestamp; inside a join gap, snap to the adjacent piece."""
+        pos = t * self.sr
+        previous_end = None
+        for window_start, source_start, length in self.pieces:
+            if pos < window_start:
+                return (previous_end if end and previous_end is not None else source_start) / self.sr
+            if pos <= window_start + length:
+                return (source_start + pos - window_start) / self.sr
+            previous_end = source_start + length
+        return previous_end / self.sr
+
+
+def pad_intervals(intervals, pad, n_samples):
+    """Widen (start, end) sample intervals by pad on each side, merging any that then overlap."""
+    merged = []
+    for start, end in intervals:
+        start, end = max(int(start) - pad, 0), min(int(end) + pad, n_samples)
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def pack_windows(y, sr, intervals, max_seconds=MAX_WINDOW_SECONDS):
+    """Greedily pack consecutive speech intervals into windows of at most max_seconds.
+
+    Intervals longer than a window are split first.
+    """
+    max_len = int(max_seconds * sr)
+    gap = int(JOIN_GAP_SECONDS * sr)
+    pieces = [(s, min(s + max_len, end)) for start, end in intervals for s in range(start, end, max_len)]
+
+    windows, current, used = [], [], 0
+    for start, end in pieces:
+        needed = end - start + (gap if current else 0)
+        if current and used + needed > max_len:
+            windows.append(_build_window(y, sr, current, gap))
+            current, used, needed = [], 0, end - start
+        current.append((start, end))
+        used += needed
+    if current:
+        windows.append(_build_window(y, sr, current, gap))
+    return windows
+
+
+def _build_window(y, sr, intervals, gap):
+    chunks, pieces, pos = [], [], 0
+    silence = np.zeros(gap, dtype=np.float32)
+    for i, (start, end) in enumerate(intervals):
+        if i:
+            chunks.append(silence)
+            pos += gap
+        chunks.append(y[start:end])
+        pieces.append((pos, start, end - start))
+        pos += end - start
+    return Window(np.concatenate(chunks).astype(np.float32, copy=False), pieces, sr)
+
+
+# --- Decoding ---
+
+def _decode_batched(windows, batch_size):
+    """Text of each window via batched whisper.decode; one segment per window."""
+    import torch
+    import whisper
+    from src.preprocessing import get_whisper_model
+
+    model = get_whisper_model()
+    options = whisper.DecodingOptions(fp16=model.device.type == "cuda")
+    per_window = []
+    for i in range(0, len(windows), batch_size):
+        batch = windows[i:i + batch_size]
+        mels = torch.stack([whisper.log_mel_spectrogram(whisper.pad_or_trim(w.samples)) for w in batch])
+        for window, result in zip(batch, whisper.decode(model, mels.to(model.device), options)):
+            per_window.append([{"start": 0.0, "end": len(window.samples) / window.sr, "text": result.text}])
+    return per_window
+
+
+def _transcribe_window(samples, word_timestamps=False, options=None):
+    """Segments (and optionally words) of one window, with window-relative timestamps."""
+    from src.preprocessing import get_whisper_model
+
+    model = get_whisper_model()
+    options = dict(options or {})
+    options.setdefault("fp16", model.device.type == "cuda")
+    result = model.transcribe(samples, word_timestamps=word_timestamps, condition_on_previous_text=False, **options)
+    return [{
+        "start": s["start"], "end": s["end"], "text": s["text"],
+        **({"words": [{"word": w["word"], "start": w["start"], "end": w["end"], "probability": w["probability"]}
+                      for w in s.get("words", [])]} if word_timestamps else {}),
+    } for s in result["segments"]]
+
+
+def _init_worker(torch_threads):
+    import torch
+    torch.set_num_threads(torch_threads)
+    import src.preprocessing  # noqa: F401 - registers the Whisper loader
+    from src.model_registry import registry
+    registry.warm_up(["whisper"])
+
+
+_pool = None
+_pool_config = None
+_pool_lock = threading.Lock()
+
+
+def window_pool(workers=WORKERS, torch_threads=TORCH_THREADS):
+    """Process pool with Whisper loaded once per worker, reused across calls."""
+    global _pool, _pool_config
+    with _pool_lock:
+        if _pool is None or _pool_config != (workers, torch_threads):
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            # Spawned: the parent may already have torch threads running
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                                        initializer=_init_worker, initargs=(torch_threads,))
+            _pool_config = (workers, torch_threads)
+        return _pool
+
+
+@atexit.register
+def _shutdown_pool():
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+
+
+def stitch(windows, per_window):
+    """Join window transcripts into one result with timestamps on the original recording."""
+    segments = []
+    for window, window_segments in zip(windows, per_window):
+        for seg in window_segments:
+            text = seg["text"].strip()
+            if not text:
+                continue
+            mapped = {"start": window.to_source_time(seg["start"]),
+                      "end": window.to_source_time(seg["end"], end=True), "text": text}
+            if "words" in seg:
+                mapped["words"] = [{**w, "start": window.to_source_time(w["start"]),
+                                    "end": window.to_source_time(w["end"], end=True)} for w in seg["words"]]
+            segments.append(mapped)
+    return {"text": " ".join(s["text"] for s in segments), "segments": segments}
+
+
+@timed("transcribe_segmented")
+def transcribe_segmented(audio, workers=WORKERS, torch_threads=TORCH_THREADS, batch_size=BATCH_SIZE,
+                         word_timestamps=False, top_db=30, max_window=MAX_WINDOW_SECONDS, **options):
+    """Transcribe only the speech of a recording; returns {"text", "segments"} like Whisper's transcribe.
+
+    With workers > 0 windows are transcribed on a process pool of that size, each
+    worker using torch_threads threads. Otherwise, windows are decoded in batches of
+    batch_size in-process, giving one segment per window; word timestamps or
+    extra decoding options switch to per-window transcription instead.
+    """
+    audio = as_audio_context(audio)
+    if audio.sr != TARGET_SR:
+        raise ValueError(f"Whisper expects {TARGET_SR} Hz audio, got {audio.sr} Hz")
+    intervals = pad_intervals(audio.speech_intervals(top_db), int(EDGE_PAD_SECONDS * audio.sr), len(audio.y))
+    windows = pack_windows(audio.y, audio.sr, intervals, max_window)
+    if not windows:
+        return {"text": "", "segments": []}
+
+    samples = [w.samples for w in windows]
+    if workers > 0:
+        per_window = list(window_pool(workers, torch_threads).map(
+            _transcribe_window, samples, repeat(word_timestamps), repeat(options)))
+    elif word_timestamps or options:
+        per_window = [_transcribe_window(s, word_timestamps, options) for s in samples]
+    else:
+        per_window = _decode_batched(windows, batch_size)
+    return stitch(windows, per_window)
@@ -1,13 +1,48 @@
 # src/visualization.py
 
+import hashlib
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib
+matplotlib.use("Agg")  # plots are only ever written to files, often from worker processes
+
 import seaborn as sns
 import matplotlib.pyplot as plt
+import numpy as np
 import pandas as pd
-import os
+
+# Columns the plots read, so callers can load a projected frame from the feature store
+PLOT_COLUMNS = [
+    "pause_count", "pause_avg_duration", "speech_rate", "pitch_variability",
+    "hesitation_count", "lexical_diversity", "incomplete_sentences", "semantic_similarity",
+    "cluster", "anomaly", "risk_score",
+]
+PAIRWISE_COLUMNS = ["pause_avg_duration", "speech_rate", "semantic_similarity", "lexical_diversity", "cluster"]
+BOX_COLUMNS = ["pause_count", "semantic_similarity", "lexical_diversity"]
+
+# Above this many rows, scatter plots become 2-D histograms and boxplots drop their fliers
+LARGE_FRAME_ROWS = 5000
+
+# Same thresholds as the interpretation shown in the Streamlit app
+RISK_BINS = [-np.inf, 0.3, 0.6, np.inf]
+RISK_LABELS = ["low (<0.3)", "moderate (0.3-0.6)", "high (>=0.6)"]
+
+# plot name -> (input columns, output files); a plot is redrawn only when its inputs change
+PLOT_SPECS = {
+    "heatmap": ([c for c in PLOT_COLUMNS if c not in ("cluster", "anomaly")], ["heatmap.png"]),
+    "distributions": (["cluster", "anomaly"], ["cluster_distribution.png", "anomaly_distribution.png"]),
+    "pairwise": (PAIRWISE_COLUMNS, ["pairplot.png"]),
+    "box": (BOX_COLUMNS + ["risk_score"], [f"{col}_boxplot.png" for col in BOX_COLUMNS]),
+}
+PLOT_VERSION = "2"  # bump when a plot's rendering changes, to redraw everything once
+MANIFEST_NAME = ".plots.json"
 
 def plot_heatmap(df: pd.DataFrame, output_path: str):
     plt.figure(figsize=(12, 8))
-    sns.heatmap(df.drop(columns=['sample_id', 'cluster', 'anomaly']).corr(), annot=True, cmap="coolwarm")
+    sns.heatmap(df.drop(columns=['sample_id', 'cluster', 'anomaly'], errors='ignore').corr(numeric_only=True), annot=True, cmap="coolwarm")
     plt.title("Feature Correlation Heatmap")
     plt.tight_layout()
     plt.savefig(output_path)
@@ -25,22 +60,114 @@ def plot_distributions(df: pd.DataFrame, output_dir: str):
     plt.close()
 
 def plot_pairwise(df: pd.DataFrame, output_path: str):
-    selected = ["pause_avg_duration", "speech_rate", "semantic_similarity", "lexical_diversity", "cluster"]
-    sns.pairplot(df[selected], hue="cluster")
+    if len(df) > LARGE_FRAME_ROWS:
+        return plot_pairwise_binned(df, output_path)
+    sns.pairplot(df[PAIRWISE_COLUMNS], hue="cluster")
     plt.suptitle("Pairwise Feature Comparison", y=1.02)
     plt.savefig(output_path)
     plt.close()
 
+def plot_pairwise_binned(df: pd.DataFrame, output_path: str, gridsize=40):
+    """Pairplot layout for large frames: hexbin densities off the diagonal, per-cluster histograms on it.
+
+    Cost grows linearly with the number of rows instead of drawing every point.
+    """
+    features = [c for c in PAIRWISE_COLUMNS if c != "cluster"]
+    n = len(features)
+    fig, axes = plt.subplots(n, n, figsize=(2.5 * n, 2.5 * n))
+    for i, y in enumerate(features):
+        for j, x in enumerate(features):
+            ax = axes[i, j]
+            if i == j:
+                for cluster, group in df.groupby("cluster"):
+                    ax.hist(group[x].dropna(), bins=50, histtype="step", label=str(cluster))
+            else:
+                pair = df[[x, y]].dropna()
+                ax.hexbin(pair[x], pair[y], gridsize=gridsize, bins="log", mincnt=1, cmap="viridis")
+            ax.set_xlabel(x if i == n - 1 else "")
+            ax.set_ylabel(y if j == 0 else "")
+    axes[0, 0].legend(title="cluster", fontsize="small")
+    fig.suptitle("Pairwise Feature Comparison", y=1.02)
+    fig.savefig(output_path, bbox_inches="tight")
+    plt.close(fig)
+
+def risk_buckets(risk_score: pd.Series) -> pd.Categorical:
+    return pd.cut(risk_score, RISK_BINS, labels=RISK_LABELS, right=False)
+
 def plot_box(df: pd.DataFrame, output_dir: str):
-    for col in ["pause_count", "semantic_similarity", "lexical_diversity"]:
-        sns.boxplot(x="risk_score", y=col, data=df)
+    # Bucketed risk on the x axis: one box per risk band, not one per distinct score
+    buckets = risk_buckets(df["risk_score"])
+    for col in BOX_COLUMNS:
+        sns.boxplot(x=buckets, y=df[col], order=RISK_LABELS, showfliers=len(df) <= LARGE_FRAME_ROWS)
+        plt.xlabel("risk_score")
         plt.title(f"{col} vs Risk Score")
         plt.savefig(os.path.join(output_dir, f"{col}_boxplot.png"))
         plt.close()
 
-def save_all_plots(df: pd.DataFrame, output_dir: str):
+def render_plot(name: str, df: pd.DataFrame, output_dir: str):
+    if name == "heatmap":
+        plot_heatmap(df, os.path.join(output_dir, "heatmap.png"))
+    elif name == "distributions":
+        plot_distributions(df, output_dir)
+    elif name == "pairwise":
+        plot_pairwise(df, os.path.join(output_dir, "pairplot.png"))
+    elif name == "box":
+        plot_box(df, output_dir)
+    else:
+        raise ValueError(f"Unknown plot: {name}")
+
+def plot_fingerprint(df: pd.DataFrame, columns) -> str:
+    digest = hashlib.sha1(json.dumps([PLOT_VERSION, LARGE_FRAME_ROWS, list(columns)]).encode("utf-8"))
+    digest.update(pd.util.hash_pandas_object(df[columns], index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+def _load_manifest(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+def _save_manifest(path, manifest):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, path)
+
+def save_all_plots(df: pd.DataFrame, output_dir: str, workers=None, force=False):
+    """Render every plot whose input columns changed since the last run; returns the names redrawn.
+
+    Plots render in parallel worker processes, each receiving only the columns it reads.
+    """
     os.makedirs(output_dir, exist_ok=True)
-    plot_heatmap(df, os.path.join(output_dir, "heatmap.png"))
-    plot_distributions(df, output_dir)
-    plot_pairwise(df, os.path.join(output_dir, "pairplot.png"))
-    plot_box(df, output_dir)
+    manifest_path = os.path.join(output_dir, MANIFEST_NAME)
+    manifest = _load_manifest(manifest_path)
+
+    pending = {}
+    for name, (columns, outputs) in PLOT_SPECS.items():
+        columns = [c for c in columns if c in df.columns]
+        fingerprint = plot_fingerprint(df, columns)
+        up_to_date = all(os.path.exists(os.path.join(output_dir, out)) for out in outputs)
+        if force or manifest.get(name) != fingerprint or not up_to_date:
+            pending[name] = (df[columns], fingerprint)
+    if not pending:
+        return []
+
+    workers = min(len(pending), workers or os.cpu_count() or 1)
+    try:
+        if workers == 1:
+            for name, (frame, fingerprint) in pending.items():
+                render_plot(name, frame, output_dir)
+                manifest[name] = fingerprint
+        else:
+            # Spawned rather than forked: the pipeline has model threads running by now
+            context = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+                futures = {name: pool.submit(render_plot, name, frame, output_dir)
+                           for name, (frame, _) in pending.items()}
+                for name, future in futures.items():
+                    future.result()
+                    manifest[name] = pending[name][1]
+    finally:
+        _save_manifest(manifest_path, manifest)
+    return list(pending)
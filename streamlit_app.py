@@ -1,22 +1,127 @@
 import streamlit as st
 import os
+import hashlib
+import shutil
+import time
 import pandas as pd
-import numpy as np
-import tempfile
-import librosa
-import subprocess
-import sys
-from src.feature_extraction import count_pauses, extract_text_features, semantic_coherence
-from src.preprocessing import transcribe_audio
+from concurrent.futures import ThreadPoolExecutor
+from src.feature_extraction import count_pauses, extract_text_features, semantic_coherence, speech_rate, get_sentence_model
+from src.pitch import pitch_variability
+from src.audio import load_audio, MIN_DURATION, SUPPORTED_EXTENSIONS
+from src.preprocessing import transcribe_audio, get_whisper_model
 from src.modeling import run_modeling
+from src.transcript import parse_transcript
+from src.jobs import to_native
 
-# Check for ffmpeg
+# Analyses run on a pool shared by all sessions, so concurrent users queue
+# instead of oversubscribing the CPU
+ANALYSIS_WORKERS = int(os.environ.get("VCD_STREAMLIT_WORKERS", 2))
+CACHE_ENTRIES = int(os.environ.get("VCD_STREAMLIT_CACHE_ENTRIES", 64))
+PROGRESS_INTERVAL = 0.2
+
+# Check for ffmpeg once per server process rather than on every rerun
+@st.cache_resource(show_spinner=False)
 def check_ffmpeg():
-    try:
-        subprocess.run(['ffmpeg', '-version'], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        return True
-    except (subprocess.SubprocessError, FileNotFoundError):
-        return False
+    return shutil.which("ffmpeg") is not None
+
+@st.cache_resource(show_spinner="Loading models...")
+def load_models():
+    # One copy per server process, shared by every session
+    return get_whisper_model(), get_sentence_model()
+
+@st.cache_resource(show_spinner=False)
+def analysis_pool():
+    return ThreadPoolExecutor(max_workers=ANALYSIS_WORKERS, thread_name_prefix="analysis")
+
+# Cached by upload hash: arguments starting with an underscore are not hashed
+@st.cache_data(show_spinner=False, max_entries=CACHE_ENTRIES)
+def transcribe_upload(digest, _data, _progress):
+    _progress(0.1, "Transcribing audio...")
+    return transcribe_audio(_data)
+
+@st.cache_data(show_spinner=False, max_entries=CACHE_ENTRIES)
+def analyze_upload(digest, transcript, _data, _name, _progress):
+    _progress(0.05, "Decoding audio...")
+    audio = load_audio(_data)
+    if audio.duration < MIN_DURATION:
+        raise ValueError("Audio file appears to be empty or corrupted. Please check the file and try again.")
+
+    _progress(0.2, "Detecting pauses...")
+    pause_count, pause_avg = count_pauses(audio)
+    _progress(0.35, "Tracking pitch...")
+    pitch = pitch_variability(audio)
+    _progress(0.55, "Extracting text features...")
+    parsed = parse_transcript(transcript)
+    hesitations, lexical_div, incomplete = extract_text_features(parsed)
+    _progress(0.7, "Scoring semantic coherence...")
+    semantic_sim = semantic_coherence(parsed)
+
+    rows = [{
+        "sample_id": _name,
+        "pause_count": pause_count,
+        "pause_avg_duration": pause_avg,
+        "speech_rate": speech_rate(parsed, audio),
+        "pitch_variability": pitch,
+        "hesitation_count": hesitations,
+        "lexical_diversity": lexical_div,
+        "incomplete_sentences": incomplete,
+        "semantic_similarity": semantic_sim
+    }]
+    _progress(0.9, "Scoring risk...")
+    final_df = run_modeling(pd.DataFrame(rows))
+    return to_native(final_df.to_dict(orient="records")[0])
+
+def run_with_progress(func, *args):
+    """Run func on the shared pool while the script thread renders its progress."""
+    status = {"fraction": 0.0, "text": "Waiting for a free worker..."}
+
+    def report(fraction, text):
+        status.update(fraction=fraction, text=text)
+
+    future = analysis_pool().submit(func, *args, report)
+    bar = st.progress(0.0, text=status["text"])
+    while not future.done():
+        bar.progress(status["fraction"], text=status["text"])
+        time.sleep(PROGRESS_INTERVAL)
+    bar.empty()
+    return future.result()
+
+def render_results(result_dict):
+    st.subheader("Analysis Results")
+
+    # Create two columns for better layout
+    col1, col2 = st.columns(2)
+
+    with col1:
+        st.markdown("### Speech Metrics")
+        st.metric("Pause Count", f"{result_dict['pause_count']:.2f}")
+        st.metric("Average Pause Duration", f"{result_dict['pause_avg_duration']:.2f} seconds")
+        st.metric("Speech Rate", f"{result_dict['speech_rate']:.2f} words/minute")
+        st.metric("Hesitation Count", f"{result_dict['hesitation_count']:.2f}")
+
+    with col2:
+        st.markdown("### Cognitive Metrics")
+        st.metric("Lexical Diversity", f"{result_dict['lexical_diversity']:.2f}")
+        st.metric("Incomplete Sentences", f"{result_dict['incomplete_sentences']:.2f}")
+        st.metric("Semantic Similarity", f"{result_dict['semantic_similarity']:.2f}")
+        st.metric("Risk Score", f"{result_dict['risk_score']:.2f}")
+
+    # Display cluster and anomaly information
+    st.markdown("### Classification")
+    cluster_status = "Normal" if result_dict['cluster'] == 0 else "Abnormal"
+    anomaly_status = "Normal" if result_dict['anomaly'] == 0 else "Anomaly"
+
+    st.info(f"**Cluster Classification:** {cluster_status}")
+    st.info(f"**Anomaly Detection:** {anomaly_status}")
+
+    # Add interpretation
+    st.markdown("### Interpretation")
+    if result_dict['risk_score'] < 0.3:
+        st.success("The speech pattern appears to be within normal cognitive parameters.")
+    elif result_dict['risk_score'] < 0.6:
+        st.warning("The speech pattern shows some signs of cognitive changes. Consider further evaluation.")
+    else:
+        st.error("The speech pattern shows significant signs of cognitive changes. Professional evaluation recommended.")
 
 # Set page config
 st.set_page_config(
@@ -29,114 +134,49 @@ st.set_page_config(
 st.title("🧠 Voice Cognitive Detection")
 st.markdown("""
 This application analyzes voice recordings to detect cognitive patterns and provide insights.
-Upload a WAV file and get detailed analysis of speech patterns, hesitations, and more.
+Upload a recording (WAV, MP3, FLAC, OGG, ...) and get detailed analysis of speech patterns, hesitations, and more.
 """)
 
-# Check for ffmpeg
+# Check for ffmpeg: only needed for codecs libsndfile cannot decode (e.g. M4A/AAC, WebM)
 if not check_ffmpeg():
-    st.error("""
-    FFmpeg is not installed or not in the PATH. This application requires FFmpeg for audio processing.
-    Please contact the administrator to install FFmpeg.
+    st.warning("""
+    FFmpeg is not installed or not in the PATH. WAV, FLAC, OGG and MP3 files still work;
+    other formats require FFmpeg. Please contact the administrator to install it.
     """)
-    st.stop()
+
+# Per-session results keyed by upload hash, so widget interactions rerun instantly
+transcripts = st.session_state.setdefault("transcripts", {})
+results = st.session_state.setdefault("results", {})
 
 # File uploader
-uploaded_file = st.file_uploader("Upload a WAV file", type=["wav"])
+uploaded_file = st.file_uploader("Upload an audio file", type=[ext.lstrip(".") for ext in SUPPORTED_EXTENSIONS])
 
 if uploaded_file is not None:
-    # Create a temporary file to save the uploaded audio
-    with tempfile.NamedTemporaryFile(delete=False, suffix='.wav') as tmp_file:
-        tmp_file.write(uploaded_file.getvalue())
-        audio_path = tmp_file.name
-    
+    data = uploaded_file.getvalue()
+    digest = hashlib.sha256(data).hexdigest()
+    load_models()
+
     # Transcribe the audio
-    with st.spinner("Transcribing audio..."):
+    if digest not in transcripts:
         try:
-            transcript = transcribe_audio(audio_path)
-            st.text_area("Transcript", transcript, height=150)
+            transcripts[digest] = run_with_progress(transcribe_upload, digest, data)
         except Exception as e:
             st.error(f"Error transcribing audio: {str(e)}")
-            transcript = None
-    
-    # Clean up the temporary file
-    os.unlink(audio_path)
-    
+    transcript = transcripts.get(digest)
+
     if transcript:
+        st.text_area("Transcript", transcript, height=150)
+
         # Analyze button
-        if st.button("Analyze Audio"):
-            with st.spinner("Analyzing audio..."):
-                try:
-                    # Validate audio file
-                    y, sr = librosa.load(audio_path)
-                    duration = librosa.get_duration(y=y, sr=sr)
-                    if duration < 0.1:  # Less than 100ms is likely an error
-                        st.error("Audio file appears to be empty or corrupted. Please check the file and try again.")
-                    else:
-                        # Feature extraction
-                        pause_count, pause_avg = count_pauses(audio_path)
-                        hesitations, lexical_div, incomplete = extract_text_features(transcript)
-                        semantic_sim = semantic_coherence(transcript)
-                        speech_rate = len(transcript.split()) / (duration / 60)
-
-                        # Create feature dataframe
-                        rows = [{
-                            "sample_id": uploaded_file.name,
-                            "pause_count": pause_count,
-                            "pause_avg_duration": pause_avg,
-                            "speech_rate": speech_rate,
-                            "pitch_variability": 0,  # Placeholder
-                            "hesitation_count": hesitations,
-                            "lexical_diversity": lexical_div,
-                            "incomplete_sentences": incomplete,
-                            "semantic_similarity": semantic_sim
-                        }]
-
-                        df = pd.DataFrame(rows)
-                        final_df = run_modeling(df)
-                        
-                        # Display results
-                        st.subheader("Analysis Results")
-                        
-                        # Convert to a more readable format
-                        result_dict = final_df.to_dict(orient="records")[0]
-                        
-                        # Create two columns for better layout
-                        col1, col2 = st.columns(2)
-                        
-                        with col1:
-                            st.markdown("### Speech Metrics")
-                            st.metric("Pause Count", f"{result_dict['pause_count']:.2f}")
-                            st.metric("Average Pause Duration", f"{result_dict['pause_avg_duration']:.2f} seconds")
-                            st.metric("Speech Rate", f"{result_dict['speech_rate']:.2f} words/minute")
-                            st.metric("Hesitation Count", f"{result_dict['hesitation_count']:.2f}")
-                        
-                        with col2:
-                            st.markdown("### Cognitive Metrics")
-                            st.metric("Lexical Diversity", f"{result_dict['lexical_diversity']:.2f}")
-                            st.metric("Incomplete Sentences", f"{result_dict['incomplete_sentences']:.2f}")
-                            st.metric("Semantic Similarity", f"{result_dict['semantic_similarity']:.2f}")
-                            st.metric("Risk Score", f"{result_dict['risk_score']:.2f}")
-                        
-                        # Display cluster and anomaly information
-                        st.markdown("### Classification")
-                        cluster_status = "Normal" if result_dict['cluster'] == 0 else "Abnormal"
-                        anomaly_status = "Normal" if result_dict['anomaly'] == 0 else "Anomaly"
-                        
-                        st.info(f"**Cluster Classification:** {cluster_status}")
-                        st.info(f"**Anomaly Detection:** {anomaly_status}")
-                        
-                        # Add interpretation
-                        st.markdown("### Interpretation")
-                        if result_dict['risk_score'] < 0.3:
-                            st.success("The speech pattern appears to be within normal cognitive parameters.")
-                        elif result_dict['risk_score'] < 0.6:
-                            st.warning("The speech pattern shows some signs of cognitive changes. Consider further evaluation.")
-                        else:
-                            st.error("The speech pattern shows significant signs of cognitive changes. Professional evaluation recommended.")
-                
-                except Exception as e:
-                    st.error(f"Error analyzing audio: {str(e)}")
+        if st.button("Analyze Audio") and digest not in results:
+            try:
+                results[digest] = run_with_progress(analyze_upload, digest, transcript, data, uploaded_file.name)
+            except Exception as e:
+                st.error(f"Error analyzing audio: {str(e)}")
+
+        if digest in results:
+            render_results(results[digest])
 
 # Footer
 st.markdown("---")
-st.markdown("Voice Cognitive Detection Tool | Developed for cognitive assessment") 
\ No newline at end of file
+st.markdown("Voice Cognitive Detection Tool | Developed for cognitive assessment")